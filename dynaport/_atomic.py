@@ -0,0 +1,39 @@
+"""
+Atomic file replacement shared by the DynaPort storage files.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write(path: Path, data: bytes) -> os.stat_result:
+    """
+    Replace ``path`` with ``data`` so readers never see a partial file.
+    
+    The data goes to a uniquely named temporary file in the same directory,
+    which is then renamed over ``path``, so concurrent writers in other
+    threads or processes never rename each other's temporary files away.
+    
+    Args:
+        path: File to replace
+        data: New contents of the file
+        
+    Returns:
+        Status of the written file, taken before the rename so it can't
+        describe a file another writer put in place afterwards
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            stat = os.fstat(fd)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return stat
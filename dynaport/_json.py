@@ -0,0 +1,57 @@
+"""
+JSON requests and responses shared by the DynaPort Flask endpoints.
+"""
+
+from typing import Any, Dict
+
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def json_response(payload: Dict[str, Any], status: int = 200):
+    """
+    Build a JSON response, using orjson when it is available.
+    
+    orjson returns bytes, which become the response body without the
+    intermediate str and encode step jsonify goes through. Payloads orjson
+    cannot encode fall back to jsonify.
+    
+    Args:
+        payload: Data to serialize
+        status: HTTP status code of the response
+        
+    Returns:
+        Flask response containing the serialized payload
+    """
+    if orjson is not None:
+        try:
+            body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+        else:
+            return current_app.response_class(body, status=status, mimetype='application/json')
+    
+    response = jsonify(payload)
+    response.status_code = status
+    return response
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that parses request bodies with orjson.
+    
+    Responses are built by json_response(), so only parsing is overridden.
+    Documents orjson rejects fall back to the default parser.
+    """
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # e.g. NaN or integers wider than 64 bits
+            return super().loads(s, **kwargs)
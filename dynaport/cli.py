@@ -14,7 +14,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List
 
 from .port_allocator import PortAllocator
-from .service_registry import ServiceRegistry, ServiceInfo
+from .service_registry import ServiceRegistry, ServiceInfo, HealthStatus
 from .config_manager import ConfigManager
 
 
@@ -88,7 +88,7 @@ def port_list(json_output: bool):
     assignments = allocator.get_all_assignments()
     
     if json_output:
-        click.echo(json.dumps(assignments, indent=2))
+        click.echo(json.dumps(dict(assignments), indent=2))
     else:
         if not assignments:
             click.echo("No port allocations found")
@@ -285,7 +285,7 @@ def service_health(app_id: str, instance: Optional[str]):
     registry._check_service_health(service)
     
     click.echo(f"Health status: {service.health_status}")
-    if service.health_status == "unhealthy":
+    if service.health_status == HealthStatus.UNHEALTHY:
         sys.exit(1)
 
 
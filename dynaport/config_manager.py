@@ -6,9 +6,64 @@ for applications, environments, and instances.
 """
 
 import os
+import copy
+import json
+import functools
 import yaml
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Tuple, Union, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Use the libyaml-backed safe loader/dumper when PyYAML was built with it
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+@functools.lru_cache(maxsize=256)
+def _split_key(key_path: str) -> Tuple[str, ...]:
+    """Split a dotted configuration key path into its components."""
+    return tuple(key_path.split('.'))
+
+
+def _is_flat(config: Dict[str, Any]) -> bool:
+    """Check whether every section of a configuration is a dictionary of leaf values."""
+    return all(
+        isinstance(key, str)
+        and isinstance(section, dict)
+        and not any(isinstance(value, dict) for value in section.values())
+        for key, section in config.items()
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_layer_merge(layer_count: int, keys: Tuple[Any, ...]) -> Callable[..., Dict[str, Any]]:
+    """
+    Generate a merge function specialized for flat layers with the given keys.
+    
+    Args:
+        layer_count: Number of layers the function takes, in order of precedence
+        keys: Top-level keys present across the layers, in insertion order
+        
+    Returns:
+        Function taking the layers and returning the merged configuration
+    """
+    params = ", ".join(f"d{i}" for i in range(layer_count))
+    sections = ", ".join(
+        "{!r}: {{{}}}".format(
+            key,
+            ", ".join(f"**d{i}.get({key!r}, _EMPTY)" for i in range(layer_count))
+        )
+        for key in keys
+    )
+    namespace: Dict[str, Any] = {"_EMPTY": MappingProxyType({})}
+    exec(f"def merge({params}):\n    return {{{sections}}}\n", namespace)
+    return namespace["merge"]
 
 
 class ConfigManager:
@@ -52,6 +107,11 @@ class ConfigManager:
         env_config = self._load_config(environment)
         if env_config:
             self._merge_config(self.config, env_config)
+        
+        # Merged app configs keyed by (app_id, instance_id, environment),
+        # validated against the generation counter and file signatures
+        self._cache: Dict[Tuple[str, Optional[str], str], Tuple[Tuple, Dict[str, Any]]] = {}
+        self._generation = 0
     
     def _ensure_default_config(self) -> None:
         """Create default configuration file if it doesn't exist."""
@@ -73,8 +133,7 @@ class ConfigManager:
                 }
             }
             
-            with open(default_config_path, 'w') as f:
-                yaml.dump(default_config, f, default_flow_style=False)
+            self._save_config("default", default_config)
     
     def _load_config(self, name: str) -> Dict[str, Any]:
         """
@@ -88,14 +147,93 @@ class ConfigManager:
         """
         config_path = self.config_dir / f"{name}.yaml"
         
-        if not config_path.exists():
+        signature = self._config_signature(name)
+        if signature is None:
             return {}
         
+        # Prefer the JSON cache if it was written from this version of the file
+        cached = self._read_json_cache(name, signature)
+        if cached is not None:
+            return cached
+        
         try:
             with open(config_path, 'r') as f:
-                return yaml.safe_load(f) or {}
+                config = yaml.load(f, Loader=Loader) or {}
         except (yaml.YAMLError, FileNotFoundError):
             return {}
+        
+        self._write_json_cache(name, signature, config)
+        return config
+    
+    def _save_config(self, name: str, config: Dict[str, Any]) -> None:
+        """
+        Save configuration to a YAML file.
+        
+        Args:
+            name: Name of the configuration file (without extension)
+            config: Configuration dictionary to save
+        """
+        with open(self.config_dir / f"{name}.yaml", 'w') as f:
+            yaml.dump(config, f, Dumper=Dumper, default_flow_style=False, sort_keys=False)
+        
+        # Drop the JSON cache rather than rely on the timestamp changing
+        self._json_cache_path(name).unlink(missing_ok=True)
+    
+    def _json_cache_path(self, name: str) -> Path:
+        """Get the path of the JSON cache kept next to a configuration file."""
+        return self.config_dir / f".{name}.json.cache"
+    
+    def _read_json_cache(self, name: str, signature: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """
+        Read the JSON cache for a configuration file.
+        
+        Args:
+            name: Name of the configuration file (without extension)
+            signature: Current signature of the YAML file
+            
+        Returns:
+            Cached configuration, or None if the cache is missing or stale
+        """
+        try:
+            data = self._json_cache_path(name).read_bytes()
+            cached = orjson.loads(data) if orjson else json.loads(data)
+        except (OSError, ValueError):
+            return None
+        
+        if not isinstance(cached, dict) or cached.get("source") != list(signature):
+            return None
+        return cached.get("config")
+    
+    def _write_json_cache(
+        self,
+        name: str,
+        signature: Tuple[int, int],
+        config: Dict[str, Any]
+    ) -> None:
+        """
+        Write the JSON cache for a configuration file.
+        
+        The cache is skipped for configurations that don't survive a JSON
+        round trip unchanged (e.g. dates or non-string keys).
+        
+        Args:
+            name: Name of the configuration file (without extension)
+            signature: Signature of the YAML file the configuration was loaded from
+            config: Parsed configuration
+        """
+        payload = {"source": list(signature), "config": config}
+        
+        try:
+            data = orjson.dumps(payload) if orjson else json.dumps(payload).encode()
+            if json.loads(data) != payload:
+                return
+            
+            cache_path = self._json_cache_path(name)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, cache_path)
+        except (TypeError, ValueError, OSError):
+            pass
     
     def _merge_config(self, base: Dict[str, Any], override: Dict[str, Any]) -> None:
         """
@@ -105,16 +243,52 @@ class ConfigManager:
             base: Base configuration dictionary (modified in-place)
             override: Override configuration dictionary
         """
-        for key, value in override.items():
-            if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                self._merge_config(base[key], value)
-            else:
-                base[key] = value
+        # Walk nested dictionaries with an explicit stack instead of recursion
+        stack = deque([(base, override)])
+        
+        while stack:
+            base_node, override_node = stack.pop()
+            
+            if not base_node:
+                base_node.update(override_node)
+                continue
+            
+            for key, value in override_node.items():
+                if isinstance(value, dict) and isinstance(base_node.get(key), dict):
+                    stack.append((base_node[key], value))
+                else:
+                    base_node[key] = value
+    
+    def _merge_layers(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge configuration layers into a new dictionary.
+        
+        Layers made only of flat sections (every top-level value is a dictionary
+        of non-dictionary values) are merged by a function specialized for
+        their keys; anything else goes through the generic deep merge.
+        
+        Args:
+            layers: Configuration dictionaries in increasing order of precedence
+            
+        Returns:
+            Merged configuration dictionary
+        """
+        if all(_is_flat(layer) for layer in layers):
+            keys = tuple(dict.fromkeys(key for layer in layers for key in layer))
+            return _compile_layer_merge(len(layers), keys)(*layers)
+        
+        merged = copy.deepcopy(layers[0])
+        for layer in layers[1:]:
+            self._merge_config(merged, layer)
+        return merged
     
     def get_app_config(self, app_id: str, instance_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get configuration for a specific application and instance.
         
+        Results are cached until one of the underlying files changes or the
+        configuration is updated through this manager.
+        
         Args:
             app_id: Application identifier
             instance_id: Optional instance identifier for multi-instance apps
@@ -122,33 +296,47 @@ class ConfigManager:
         Returns:
             Dictionary containing merged configuration for the app/instance
         """
-        # Start with the base configuration
-        app_config = self.config.copy()
+        # Application, environment and instance layers in precedence order
+        names = [f"app_{app_id}", f"app_{app_id}_{self.environment}"]
+        if instance_id:
+            names.append(f"instance_{app_id}_{instance_id}")
+            names.append(f"instance_{app_id}_{instance_id}_{self.environment}")
         
-        # Load application-specific configuration
-        app_specific = self._load_config(f"app_{app_id}")
-        if app_specific:
-            self._merge_config(app_config, app_specific)
+        # Return the cached result if nothing it was built from has changed
+        cache_key = (app_id, instance_id, self.environment)
+        signature = (self._generation, tuple(self._config_signature(name) for name in names))
+        cached = self._cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return copy.deepcopy(cached[1])
         
-        # Load environment-specific application configuration
-        env_app_specific = self._load_config(f"app_{app_id}_{self.environment}")
-        if env_app_specific:
-            self._merge_config(app_config, env_app_specific)
+        # Merge the layers that exist on top of the base
+        layers = [self.config]
+        for name in names:
+            layer = self._load_config(name)
+            if layer:
+                layers.append(layer)
         
-        # Load instance-specific configuration if provided
-        if instance_id:
-            instance_specific = self._load_config(f"instance_{app_id}_{instance_id}")
-            if instance_specific:
-                self._merge_config(app_config, instance_specific)
-                
-            # Load environment-specific instance configuration
-            env_instance_specific = self._load_config(
-                f"instance_{app_id}_{instance_id}_{self.environment}"
-            )
-            if env_instance_specific:
-                self._merge_config(app_config, env_instance_specific)
-        
-        return app_config
+        app_config = self._merge_layers(layers)
+        
+        self._cache[cache_key] = (signature, app_config)
+        
+        return copy.deepcopy(app_config)
+    
+    def _config_signature(self, name: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the modification signature of a configuration file.
+        
+        Args:
+            name: Name of the configuration file (without extension)
+            
+        Returns:
+            Tuple of (mtime in nanoseconds, size), or None if the file doesn't exist
+        """
+        try:
+            stat = (self.config_dir / f"{name}.yaml").stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
     
     def save_app_config(
         self, 
@@ -177,10 +365,10 @@ class ConfigManager:
             else:
                 config_name = f"app_{app_id}"
         
-        config_path = self.config_dir / f"{config_name}.yaml"
+        self._save_config(config_name, config)
         
-        with open(config_path, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False)
+        # Invalidate cached app configurations
+        self._generation += 1
     
     def get_config_value(self, key_path: str, default: Any = None) -> Any:
         """
@@ -193,7 +381,19 @@ class ConfigManager:
         Returns:
             Configuration value, or default if not found
         """
-        keys = key_path.split('.')
+        return self.get_path(_split_key(key_path), default)
+    
+    def get_path(self, keys: Tuple[str, ...], default: Any = None) -> Any:
+        """
+        Get a specific configuration value using a pre-split key path.
+        
+        Args:
+            keys: Path to the configuration value (e.g., ("port_allocator", "port_range"))
+            default: Default value to return if the key doesn't exist
+            
+        Returns:
+            Configuration value, or default if not found
+        """
         value = self.config
         
         for key in keys:
@@ -212,7 +412,7 @@ class ConfigManager:
             key_path: Path to the configuration value (e.g., "port_allocator.port_range")
             value: Value to set
         """
-        keys = key_path.split('.')
+        keys = _split_key(key_path)
         config = self.config
         
         # Navigate to the parent of the target key
@@ -225,5 +425,7 @@ class ConfigManager:
         config[keys[-1]] = value
         
         # Save the updated configuration
-        with open(self.config_dir / f"{self.environment}.yaml", 'w') as f:
-            yaml.dump(self.config, f, default_flow_style=False)
+        self._save_config(self.environment, self.config)
+        
+        # Invalidate cached app configurations
+        self._generation += 1
@@ -7,22 +7,26 @@ including automatic port configuration and service registration.
 
 import os
 import sys
-import uuid
 import socket
 import logging
 from typing import Optional, Dict, Any, Callable, List, Union, TypeVar, cast
 
-from flask import Flask, Blueprint, request, jsonify, current_app
+from flask import Flask, Blueprint, request, current_app
 
 from .port_allocator import PortAllocator
 from .service_registry import ServiceRegistry, ServiceInfo
 from .config_manager import ConfigManager
-
+from ._json import json_response
 
 # Type variable for Flask application factory functions
 T = TypeVar('T', bound=Flask)
 
 
+def _gen_instance_id() -> str:
+    """Generate a random identifier for an application instance."""
+    return os.urandom(8).hex()
+
+
 class DynaPortFlask:
     """
     Flask integration for DynaPort.
@@ -60,7 +64,7 @@ class DynaPortFlask:
             metadata: Additional metadata for the application
         """
         self.app_id = app_id
-        self.instance_id = instance_id or str(uuid.uuid4())
+        self.instance_id = instance_id or _gen_instance_id()
         self.name = name or app_id
         self.health_endpoint = health_endpoint
         self.dependencies = dependencies or []
@@ -77,10 +81,11 @@ class DynaPortFlask:
             instance_id=self.instance_id
         )
         
-        # Allocate port
+        # Allocate port, holding it until the application is wrapped
         self.port = self.port_allocator.allocate_port(
             app_id=f"{self.app_id}:{self.instance_id}",
-            preferred_port=preferred_port
+            preferred_port=preferred_port,
+            hold=True
         )
         
         # Flask app reference (set when wrap_app is called)
@@ -117,6 +122,9 @@ class DynaPortFlask:
         """
         self.app = app
         
+        # Hand the reserved port over, so the app can be run by any server
+        self.port_allocator.release_reservation(f"{self.app_id}:{self.instance_id}")
+        
         # Add health endpoint
         self._add_health_endpoint(app)
         
@@ -153,7 +161,7 @@ class DynaPortFlask:
         @app.route(f"/{endpoint}")
         def health_check():
             """Health check endpoint."""
-            return jsonify({
+            return json_response({
                 "status": "healthy",
                 "app_id": self.app_id,
                 "instance_id": self.instance_id,
@@ -172,7 +180,7 @@ class DynaPortFlask:
         @bp.route('/dynaport/info')
         def dynaport_info():
             """DynaPort information endpoint."""
-            return jsonify({
+            return json_response({
                 "app_id": self.app_id,
                 "instance_id": self.instance_id,
                 "name": self.name,
@@ -200,6 +208,9 @@ class DynaPortFlask:
         if 'host' not in kwargs:
             kwargs['host'] = '0.0.0.0'
         
+        # Hand the reserved port over to the application
+        self.port_allocator.release_reservation(f"{self.app_id}:{self.instance_id}")
+        
         try:
             app.run(**kwargs)
         finally:
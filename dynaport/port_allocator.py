@@ -9,8 +9,25 @@ import socket
 import random
 import json
 import os
+import zlib
+import threading
+from itertools import chain, compress
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple, Set
+from types import MappingProxyType
+from typing import Optional, List, Dict, Tuple, Set, FrozenSet, Iterable, Mapping
+
+from ._atomic import atomic_write
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Number of TCP ports, used to size the reserved-port bitmap
+_PORT_COUNT = 65536
+
+# bytes.translate table turning a "taken" mask (0 = free) into a "free" mask
+_FREE_TABLE = bytes([1]) + bytes(255)
 
 
 class PortAllocator:
@@ -36,6 +53,9 @@ class PortAllocator:
             reserved_ports: Set of ports that should not be allocated automatically
         """
         self.port_range = port_range
+        
+        # One byte per port, set to 1 for reserved ports
+        self._reserved_bits = bytearray(_PORT_COUNT)
         self.reserved_ports = reserved_ports or set()
         
         if storage_path is None:
@@ -49,6 +69,15 @@ class PortAllocator:
             self.storage_dir.mkdir(exist_ok=True)
             
         self.port_assignments = self._load_port_assignments()
+        
+        # Bound sockets holding ports allocated with hold=True until the
+        # application takes them over
+        self._held_sockets: Dict[str, socket.socket] = {}
+        
+        # Unbound probe socket per thread, reused across availability checks.
+        # The set tracks every thread's probe socket so close() can reach them.
+        self._probe_local = threading.local()
+        self._probe_sockets: Set[socket.socket] = set()
     
     def _load_port_assignments(self) -> Dict[str, int]:
         """
@@ -67,9 +96,13 @@ class PortAllocator:
             return {}
     
     def _save_port_assignments(self) -> None:
-        """Save port assignments to storage."""
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.port_assignments, f, indent=2)
+        """Save port assignments to storage, replacing the file atomically."""
+        if orjson is not None:
+            data = orjson.dumps(self.port_assignments, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(self.port_assignments, indent=2).encode()
+        
+        atomic_write(self.storage_path, data)
     
     def is_port_available(self, port: int) -> bool:
         """
@@ -81,58 +114,209 @@ class PortAllocator:
         Returns:
             True if the port is available, False otherwise
         """
-        if port in self.reserved_ports:
+        if not 0 <= port < _PORT_COUNT:
             return False
+        
+        return self._first_bindable((port,)) is not None
+    
+    def availability(self, ports: Iterable[int]) -> List[bool]:
+        """
+        Check several ports at once.
+        
+        Each distinct port is probed only once, sharing the probe socket
+        across the checks.
+        
+        Args:
+            ports: Port numbers to check
             
+        Returns:
+            Whether each port is available, in the order given
+        """
+        checked: Dict[int, bool] = {}
+        results = []
+        for port in ports:
+            available = checked.get(port)
+            if available is None:
+                available = checked[port] = self.is_port_available(port)
+            results.append(available)
+        return results
+    
+    def _try_reserve(self, port: int) -> Optional[socket.socket]:
+        """
+        Try to bind a port and keep it bound.
+        
+        SO_REUSEADDR is not set, so no other socket can bind the port while
+        the returned socket stays open.
+        
+        Args:
+            port: Port number to bind
+            
+        Returns:
+            The bound socket, or None if the port is reserved or in use
+        """
+        if not 0 <= port < _PORT_COUNT or self._reserved_bits[port]:
+            return None
+        
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
-            # Try to bind to the port to see if it's available
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(0.5)
-                s.bind(('127.0.0.1', port))
-                return True
+            s.bind(('127.0.0.1', port))
         except (socket.error, OSError):
-            return False
+            s.close()
+            return None
+        
+        return s
+    
+    def _assign(self, app_id: str, port: int, sock: socket.socket, hold: bool) -> int:
+        """
+        Commit a port assignment.
+        
+        Args:
+            app_id: Unique identifier for the application
+            port: Port number being assigned
+            sock: Socket bound to the port
+            hold: Keep the socket open until release_reservation() is called,
+                  instead of closing it right away
+            
+        Returns:
+            The assigned port number
+        """
+        previous = self._held_sockets.pop(app_id, None)
+        if previous is not None and previous is not sock:
+            previous.close()
+        
+        if hold:
+            self._held_sockets[app_id] = sock
+        else:
+            sock.close()
+        if self.port_assignments.get(app_id) != port:
+            self.port_assignments[app_id] = port
+            self._save_port_assignments()
+        return port
     
-    def find_available_port(self) -> int:
+    def _probe_socket(self) -> socket.socket:
+        """
+        Get this thread's unbound probe socket, creating it if needed.
+        
+        Returns:
+            Socket that can be used to test-bind ports
+        """
+        s = getattr(self._probe_local, "sock", None)
+        # A socket closed by close() is replaced as well
+        if s is None or s.fileno() == -1:
+            # No SO_REUSEADDR: on BSD and macOS it lets the bind succeed
+            # while another socket listens on the wildcard address
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._probe_local.sock = s
+            self._probe_sockets.add(s)
+        return s
+    
+    def _first_bindable(self, ports: Iterable[int]) -> Optional[int]:
+        """
+        Find the first port that can be bound, reusing the probe socket.
+        
+        A failed bind leaves the socket unbound, so the same socket is tried
+        against each candidate until one succeeds. A successful bind uses the
+        socket up, so it is closed and replaced on the next probe.
+        
+        Args:
+            ports: Candidate port numbers in the order they should be tried
+            
+        Returns:
+            The first port that could be bound, or None if none could
+        """
+        s = self._probe_socket()
+        reserved = self._reserved_bits
+        
+        for port in ports:
+            if reserved[port]:
+                continue
+            try:
+                s.bind(('127.0.0.1', port))
+            except (socket.error, OSError):
+                continue
+            
+            self._probe_local.sock = None
+            self._probe_sockets.discard(s)
+            s.close()
+            return port
+        
+        return None
+    
+    def find_available_port(self, app_id: Optional[str] = None) -> int:
         """
         Find an available port within the configured range.
         
+        Args:
+            app_id: Application the port is for. Each application scans the
+                    range in its own stable order, so concurrent allocators
+                    don't all contend for the same ports first.
+        
         Returns:
             An available port number
             
         Raises:
             RuntimeError: If no ports are available in the configured range
         """
-        # First try ports that were previously assigned but might be free now
-        used_ports = set(self.port_assignments.values())
-        for port in used_ports:
-            if self.port_range[0] <= port <= self.port_range[1] and self.is_port_available(port):
-                return port
-        
-        # Then try random ports in the range
-        available_ports = [
-            p for p in range(self.port_range[0], self.port_range[1] + 1)
-            if p not in self.reserved_ports and p not in used_ports
-        ]
-        
-        random.shuffle(available_ports)
-        
-        for port in available_ports:
-            if self.is_port_available(port):
-                return port
+        port = self._first_bindable(self._candidate_ports(app_id))
+        if port is not None:
+            return port
         
         # If we get here, no ports are available
         raise RuntimeError(
             f"No available ports found in range {self.port_range[0]}-{self.port_range[1]}"
         )
     
-    def allocate_port(self, app_id: str, preferred_port: Optional[int] = None) -> int:
+    def _candidate_ports(self, app_id: Optional[str] = None) -> Iterable[int]:
+        """
+        Get the ports to try when looking for a free one, in order.
+        
+        Args:
+            app_id: Application used to seed the scan order (random if None)
+        
+        Returns:
+            Previously assigned ports in range, followed by the remaining
+            unreserved ports of the range, shuffled
+        """
+        low, high = self.port_range
+        
+        # First try ports that were previously assigned but might be free now
+        previous_ports = [
+            p for p in set(self.port_assignments.values())
+            if low <= p <= high
+        ]
+        
+        # Then try random ports in the range. Mark reserved and assigned ports
+        # in a copy of the reserved bitmap slice, and let compress() pick the
+        # free ones in C instead of testing every port in Python.
+        taken = self._reserved_bits[low:high + 1]
+        for p in previous_ports:
+            taken[p - low] = 1
+        available_ports = list(compress(range(low, high + 1), taken.translate(_FREE_TABLE)))
+        
+        if app_id is None:
+            random.shuffle(available_ports)
+        else:
+            # crc32 rather than hash() so the order is stable across processes
+            random.Random(zlib.crc32(app_id.encode())).shuffle(available_ports)
+        
+        return chain(previous_ports, available_ports)
+    
+    def allocate_port(
+        self,
+        app_id: str,
+        preferred_port: Optional[int] = None,
+        hold: bool = False
+    ) -> int:
         """
         Allocate a port for an application.
         
         Args:
             app_id: Unique identifier for the application
             preferred_port: Preferred port to allocate, if available
+            hold: Keep the port bound from the availability check until
+                  release_reservation() is called, so nothing else can take
+                  it in between. The application cannot bind the port until
+                  the reservation is released.
             
         Returns:
             Allocated port number
@@ -140,23 +324,51 @@ class PortAllocator:
         # If the app already has a port assigned, return it
         if app_id in self.port_assignments:
             assigned_port = self.port_assignments[app_id]
-            # Verify the port is still available
-            if self.is_port_available(assigned_port):
+            # No need to check a port we are still holding, or one the
+            # caller explicitly asked for again
+            if app_id in self._held_sockets or preferred_port == assigned_port:
                 return assigned_port
+            
+            # Verify the port is still available
+            sock = self._try_reserve(assigned_port)
+            if sock is not None:
+                return self._assign(app_id, assigned_port, sock, hold)
         
         # Try to allocate the preferred port if specified
         if preferred_port is not None:
-            if self.port_range[0] <= preferred_port <= self.port_range[1] and \
-               self.is_port_available(preferred_port):
-                self.port_assignments[app_id] = preferred_port
-                self._save_port_assignments()
-                return preferred_port
+            if self.port_range[0] <= preferred_port <= self.port_range[1]:
+                sock = self._try_reserve(preferred_port)
+                if sock is not None:
+                    return self._assign(app_id, preferred_port, sock, hold)
         
         # Find an available port
-        port = self.find_available_port()
-        self.port_assignments[app_id] = port
-        self._save_port_assignments()
-        return port
+        port = self.find_available_port(app_id)
+        sock = self._try_reserve(port)
+        if sock is not None:
+            return self._assign(app_id, port, sock, hold)
+        
+        # The port was taken since the scan; try the other candidates
+        for port in self._candidate_ports(app_id):
+            sock = self._try_reserve(port)
+            if sock is not None:
+                return self._assign(app_id, port, sock, hold)
+        
+        raise RuntimeError(
+            f"No available ports found in range {self.port_range[0]}-{self.port_range[1]}"
+        )
+    
+    def release_reservation(self, app_id: str) -> None:
+        """
+        Close the socket holding an application's port, keeping the assignment.
+        
+        Call this right before the application binds the port itself.
+        
+        Args:
+            app_id: Unique identifier for the application
+        """
+        sock = self._held_sockets.pop(app_id, None)
+        if sock is not None:
+            sock.close()
     
     def release_port(self, app_id: str) -> None:
         """
@@ -165,10 +377,26 @@ class PortAllocator:
         Args:
             app_id: Unique identifier for the application
         """
+        self.release_reservation(app_id)
+        
         if app_id in self.port_assignments:
             del self.port_assignments[app_id]
             self._save_port_assignments()
     
+    def close(self) -> None:
+        """
+        Close the sockets used by the allocator.
+        
+        This releases all held reservations, keeping the assignments, and
+        closes the probe sockets of every thread. The allocator remains
+        usable afterwards.
+        """
+        for app_id in list(self._held_sockets):
+            self.release_reservation(app_id)
+        
+        while self._probe_sockets:
+            self._probe_sockets.pop().close()
+    
     def get_assigned_port(self, app_id: str) -> Optional[int]:
         """
         Get the port assigned to an application.
@@ -181,14 +409,35 @@ class PortAllocator:
         """
         return self.port_assignments.get(app_id)
     
-    def get_all_assignments(self) -> Dict[str, int]:
+    def get_all_assignments(self) -> Mapping[str, int]:
         """
         Get all port assignments.
         
         Returns:
-            Dictionary mapping application IDs to port numbers
+            Read-only, live view mapping application IDs to port numbers
         """
-        return self.port_assignments.copy()
+        return MappingProxyType(self.port_assignments)
+    
+    @property
+    def reserved_ports(self) -> FrozenSet[int]:
+        """
+        Ports that should not be allocated automatically.
+        
+        Returns a frozenset, so changes made to it in place raise instead of
+        being lost; use reserve_port() and unreserve_port() to change it.
+        """
+        ports = []
+        port = self._reserved_bits.find(1)
+        while port != -1:
+            ports.append(port)
+            port = self._reserved_bits.find(1, port + 1)
+        return frozenset(ports)
+    
+    @reserved_ports.setter
+    def reserved_ports(self, ports: Set[int]) -> None:
+        self._reserved_bits = bytearray(_PORT_COUNT)
+        for port in ports:
+            self.reserve_port(port)
     
     def reserve_port(self, port: int) -> None:
         """
@@ -197,7 +446,10 @@ class PortAllocator:
         Args:
             port: Port number to reserve
         """
-        self.reserved_ports.add(port)
+        if not 0 <= port < _PORT_COUNT:
+            raise ValueError(f"Invalid port number: {port}")
+        
+        self._reserved_bits[port] = 1
     
     def unreserve_port(self, port: int) -> None:
         """
@@ -206,5 +458,5 @@ class PortAllocator:
         Args:
             port: Port number to unreserve
         """
-        if port in self.reserved_ports:
-            self.reserved_ports.remove(port)
+        if 0 <= port < _PORT_COUNT:
+            self._reserved_bits[port] = 0
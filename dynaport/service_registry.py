@@ -5,16 +5,111 @@ This module provides functionality for registering, discovering,
 and monitoring services running in the DynaPort ecosystem.
 """
 
+import os
+import sys
+import copy
 import json
 import time
+import atexit
+import weakref
 import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Callable, Set, Tuple
-from dataclasses import dataclass, asdict, field
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple, Iterable, Mapping, TYPE_CHECKING
+from dataclasses import dataclass, field, fields, MISSING
+from enum import Enum, IntEnum
 
+from ._atomic import atomic_write
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional speedup
+    ijson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+if TYPE_CHECKING:
+    import asyncio
+
+# aiohttp module once _load_aiohttp() has run (None if not installed)
+_aiohttp_module: Any = False
+
+# Storage files larger than this are parsed incrementally when ijson is available
+_STREAM_LOAD_THRESHOLD = 1024 * 1024
+
+# Errors raised when the storage file is not valid JSON
+_JSON_ERRORS: Tuple[type, ...] = (json.JSONDecodeError,) + ((ijson.JSONError,) if ijson else ())
+
+
+# Registries with pending writes are flushed when the interpreter exits
+_live_registries: "weakref.WeakSet[ServiceRegistry]" = weakref.WeakSet()
+
+
+def _load_aiohttp() -> Any:
+    """
+    Import aiohttp on first use, so importing DynaPort doesn't pay for it.
+    
+    Returns:
+        The aiohttp module, or None if it isn't installed
+    """
+    global _aiohttp_module
+    
+    if _aiohttp_module is False:
+        try:
+            import aiohttp
+        except ImportError:  # pragma: no cover - optional speedup
+            aiohttp = None
+        _aiohttp_module = aiohttp
+    return _aiohttp_module
+
+
+@atexit.register
+def _flush_live_registries() -> None:
+    """Write out pending changes of all live registries."""
+    for registry in list(_live_registries):
+        try:
+            registry._flush_now()
+        except OSError:
+            pass
+
+
+class HealthStatus(IntEnum):
+    """Result of the last health check of a service."""
+    
+    UNKNOWN = 0
+    HEALTHY = 1
+    UNHEALTHY = 2
+    
+    def __str__(self) -> str:
+        return self.name.lower()
+    
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
+    
+    @classmethod
+    def _missing_(cls, value: object) -> Optional['HealthStatus']:
+        # Accept the lowercase names used in storage and by older callers
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
+
+# Slotted dataclasses need Python 3.10+; older versions fall back to __dict__
+_DATACLASS_OPTIONS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ServiceInfo:
     """Information about a registered service."""
     
@@ -26,28 +121,134 @@ class ServiceInfo:
     status: str = "unknown"  # unknown, starting, running, stopped, error
     health_endpoint: Optional[str] = None
     last_health_check: Optional[float] = None
-    health_status: str = "unknown"  # unknown, healthy, unhealthy
+    health_status: HealthStatus = HealthStatus.UNKNOWN
     dependencies: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary representation."""
-        return asdict(self)
+    # Derived from the other fields on creation; update_address() refreshes url
+    service_id: str = field(init=False, repr=False, compare=False)
+    url: str = field(init=False, repr=False, compare=False)
     
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'ServiceInfo':
-        """Create from dictionary representation."""
-        return cls(**data)
+    def __post_init__(self) -> None:
+        if type(self.health_status) is not HealthStatus:
+            self.health_status = HealthStatus(self.health_status)
+        self.service_id = f"{self.app_id}:{self.instance_id}"
+        self.url = f"http://{self.host}:{self.port}"
     
-    @property
-    def service_id(self) -> str:
-        """Get the unique service ID."""
-        return f"{self.app_id}:{self.instance_id}"
+    def update_address(self, host: Optional[str] = None, port: Optional[int] = None) -> None:
+        """
+        Change the host and/or port of the service.
+        
+        Use this rather than assigning the fields, so the derived url is
+        updated too.
+        
+        Args:
+            host: New host name (unchanged if None)
+            port: New port number (unchanged if None)
+        """
+        if host is not None:
+            self.host = host
+        if port is not None:
+            self.port = port
+        self.url = f"http://{self.host}:{self.port}"
     
-    @property
-    def url(self) -> str:
-        """Get the base URL for the service."""
-        return f"http://{self.host}:{self.port}"
+    if TYPE_CHECKING:
+        # Generated by _compile_dict_methods below
+        def to_dict(self) -> Dict[str, Any]: ...
+        
+        def to_builtins(self) -> Dict[str, Any]: ...
+        
+        @classmethod
+        def from_dict(cls, data: Dict[str, Any]) -> 'ServiceInfo': ...
+
+
+def _enum_parser(enum_cls: type, default: Enum) -> Callable[[Any], Enum]:
+    """
+    Build a function converting stored values to members of an enum.
+    
+    Args:
+        enum_cls: Enum to convert to
+        default: Member returned for values the enum doesn't know
+        
+    Returns:
+        Conversion function
+    """
+    def parse(value: Any) -> Enum:
+        try:
+            return enum_cls(value)
+        except ValueError:
+            return default
+    
+    return parse
+
+
+def _compile_dict_methods(cls: type) -> None:
+    """
+    Generate to_dict(), to_builtins() and from_dict() for a dataclass.
+    
+    The generated functions name every init field directly instead of
+    reflecting over the fields on each call. Fields with a default factory
+    hold mutable containers and are deep-copied by to_dict, as
+    dataclasses.asdict does; to_builtins shares them with the instance, for
+    dictionaries that are serialized straight away. Enum fields are stored
+    as their string form; unknown stored values load as the field default.
+    
+    Args:
+        cls: Dataclass to add the methods to
+    """
+    namespace: Dict[str, Any] = {"_deepcopy": copy.deepcopy}
+    items = []
+    shared_items = []
+    args = []
+    
+    for f in fields(cls):
+        if not f.init:
+            continue
+        
+        if f.default_factory is not MISSING:
+            items.append(f"{f.name!r}: _deepcopy(self.{f.name})")
+            shared_items.append(f"{f.name!r}: self.{f.name}")
+            namespace[f"_factory_{f.name}"] = f.default_factory
+            args.append(f"{f.name}=data[{f.name!r}] if {f.name!r} in data else _factory_{f.name}()")
+        elif isinstance(f.type, type) and issubclass(f.type, Enum):
+            items.append(f"{f.name!r}: str(self.{f.name})")
+            shared_items.append(items[-1])
+            namespace[f"_default_{f.name}"] = f.default
+            namespace[f"_parse_{f.name}"] = _enum_parser(f.type, f.default)
+            args.append(f"{f.name}=_parse_{f.name}(data.get({f.name!r}, _default_{f.name}))")
+        elif f.default is not MISSING:
+            items.append(f"{f.name!r}: self.{f.name}")
+            shared_items.append(items[-1])
+            namespace[f"_default_{f.name}"] = f.default
+            args.append(f"{f.name}=data.get({f.name!r}, _default_{f.name})")
+        else:
+            items.append(f"{f.name!r}: self.{f.name}")
+            shared_items.append(items[-1])
+            args.append(f"{f.name}=data[{f.name!r}]")
+    
+    source = (
+        "def to_dict(self):\n"
+        f"    return {{{', '.join(items)}}}\n"
+        "def to_builtins(self):\n"
+        f"    return {{{', '.join(shared_items)}}}\n"
+        "def from_dict(cls, data):\n"
+        f"    return cls({', '.join(args)})\n"
+    )
+    exec(source, namespace)
+    
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = "Convert to dictionary representation."
+    to_builtins = namespace["to_builtins"]
+    to_builtins.__doc__ = "Convert to a dictionary that shares mutable fields, for serialization."
+    from_dict = namespace["from_dict"]
+    from_dict.__doc__ = "Create from dictionary representation, ignoring unknown keys."
+    
+    cls.to_dict = to_dict
+    cls.to_builtins = to_builtins
+    cls.from_dict = classmethod(from_dict)
+
+
+_compile_dict_methods(ServiceInfo)
 
 
 class ServiceRegistry:
@@ -60,7 +261,8 @@ class ServiceRegistry:
     def __init__(
         self,
         storage_path: Optional[str] = None,
-        health_check_interval: int = 60
+        health_check_interval: int = 60,
+        flush_interval: float = 0.05
     ):
         """
         Initialize the service registry.
@@ -69,6 +271,7 @@ class ServiceRegistry:
             storage_path: Path to store service registry data.
                           Defaults to ~/.dynaport/services.json
             health_check_interval: Interval in seconds between health checks
+            flush_interval: Seconds to coalesce changes before writing them to storage
         """
         if storage_path is None:
             home_dir = Path.home()
@@ -80,16 +283,47 @@ class ServiceRegistry:
             self.storage_dir = self.storage_path.parent
             self.storage_dir.mkdir(exist_ok=True)
         
-        self.services: Dict[str, ServiceInfo] = {}
+        # Services by ID, plus an index of service IDs by application
+        # (dictionaries used as insertion-ordered sets). Mutations replace
+        # these dictionaries instead of changing them in place, so readers
+        # never need a lock; _snapshot is a tuple of the current services.
+        self._by_app: Dict[str, Dict[str, None]] = {}
+        self._snapshot: Tuple[ServiceInfo, ...] = ()
+        self._snapshot_lock = threading.Lock()
+        self.services = {}
         self.health_check_interval = health_check_interval
         self.health_check_thread: Optional[threading.Thread] = None
         self.stop_health_check = threading.Event()
         
+        # Keep-alive connections reused across health checks
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=256, pool_maxsize=256, max_retries=Retry(total=0))
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        
+        # Bounded pool so slow services are checked concurrently
+        self._health_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dynaport-health")
+        
+        # Event loop and aiohttp session for asynchronous checks, created on first use
+        self._async_loop: Optional["asyncio.AbstractEventLoop"] = None
+        self._aiohttp: Optional[Any] = None
+        self._async_lock = threading.Lock()
+        
+        # Changes are marked dirty and written by a background flusher
+        self.flush_interval = flush_interval
+        self._dirty = threading.Event()
+        # Reentrant, as _flush_now holds it around _save_services
+        self._save_lock = threading.RLock()
+        self._stop_flusher = threading.Event()
+        self._flusher_thread: Optional[threading.Thread] = None
+        
         # Load existing services
         self._load_services()
         
-        # Start health check thread
+        # Start health check and flusher threads
         self._start_health_check_thread()
+        self._start_flusher_thread()
+        _live_registries.add(self)
     
     def _load_services(self) -> None:
         """Load services from storage."""
@@ -97,21 +331,173 @@ class ServiceRegistry:
             return
         
         try:
+            # Prefer the binary sidecar when it matches the JSON file
+            services_data = self._read_sidecar()
+            if services_data is not None:
+                self._add_loaded_services(services_data)
+                return
+            
+            if ijson is not None and self.storage_path.stat().st_size > _STREAM_LOAD_THRESHOLD:
+                # Build services one record at a time instead of materializing the whole list
+                with open(self.storage_path, 'rb') as f:
+                    self._add_loaded_services(ijson.items(f, 'item', use_float=True))
+                return
+            
             with open(self.storage_path, 'r') as f:
                 services_data = json.load(f)
                 
-            for service_data in services_data:
-                service = ServiceInfo.from_dict(service_data)
-                self.services[service.service_id] = service
-        except (json.JSONDecodeError, FileNotFoundError):
+            self._add_loaded_services(services_data)
+        except _JSON_ERRORS + (FileNotFoundError,):
             pass
+        finally:
+            self._reindex()
+    
+    def _add_loaded_services(self, services_data: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add services read from storage.
+        
+        Args:
+            services_data: Dictionary representations of the services
+        """
+        for service_data in services_data:
+            service = ServiceInfo.from_dict(service_data)
+            self._services[service.service_id] = service
+    
+    def _sidecar_path(self) -> Path:
+        """Get the path of the msgpack copy of the services file."""
+        return self.storage_path.with_suffix(".mpk")
+    
+    def _storage_signature(self, stat: Optional[os.stat_result] = None) -> List[int]:
+        """
+        Get the modification time and size of the services file.
+        
+        Args:
+            stat: Status of the file to use instead of the current services file
+        """
+        if stat is None:
+            stat = self.storage_path.stat()
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def _read_sidecar(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Read services from the msgpack sidecar.
+        
+        Returns:
+            Services data, or None if msgpack is unavailable or the sidecar is
+            missing, unreadable or was not written for the current services file
+        """
+        if msgpack is None:
+            return None
+        
+        try:
+            data = msgpack.unpackb(self._sidecar_path().read_bytes(), raw=False, strict_map_key=False)
+            if data["source"] != self._storage_signature():
+                return None
+            return data["services"]
+        except (OSError, ValueError, TypeError, KeyError, msgpack.UnpackException):
+            return None
+    
+    def _write_sidecar(self, services_data: List[Dict[str, Any]], source: os.stat_result) -> None:
+        """
+        Write the msgpack sidecar for the services file just saved.
+        
+        Args:
+            services_data: Dictionary representations of the services
+            source: Status of the services file as it was written
+        """
+        sidecar_path = self._sidecar_path()
+        try:
+            data = msgpack.packb(
+                {"source": self._storage_signature(source), "services": services_data},
+                use_bin_type=True
+            )
+            atomic_write(sidecar_path, data)
+        except (TypeError, ValueError, OSError):
+            # Don't leave a sidecar for an older version of the file behind
+            try:
+                sidecar_path.unlink()
+            except OSError:
+                pass
+    
+    @property
+    def services(self) -> Mapping[str, ServiceInfo]:
+        """Registered services by service ID, as a read-only view."""
+        return MappingProxyType(self._services)
+    
+    @services.setter
+    def services(self, services: Dict[str, ServiceInfo]) -> None:
+        with self._snapshot_lock:
+            self._services = services
+            self._reindex()
+    
+    def _reindex(self) -> None:
+        """Rebuild the index of service IDs by application and the snapshot."""
+        by_app: Dict[str, Dict[str, None]] = {}
+        for service_id, service in self._services.items():
+            by_app.setdefault(service.app_id, {})[service_id] = None
+        self._by_app = by_app
+        self._snapshot = tuple(self._services.values())
     
     def _save_services(self) -> None:
-        """Save services to storage."""
-        services_data = [service.to_dict() for service in self.services.values()]
+        """Save services to storage, replacing the file atomically."""
+        # Take the snapshot under the lock as well, so a concurrent save that
+        # started earlier can't overwrite the file with older data
+        with self._save_lock:
+            services_data = [service.to_dict() for service in self._snapshot]
+            
+            data = None
+            if orjson is not None:
+                try:
+                    data = orjson.dumps(services_data, option=orjson.OPT_INDENT_2)
+                except TypeError:
+                    # Metadata orjson can't encode, e.g. non-string keys
+                    pass
+            if data is None:
+                data = json.dumps(services_data, indent=2).encode()
+            
+            # Write to a temporary file and rename it so readers never see a partial file
+            stat = atomic_write(self.storage_path, data)
+            
+            if msgpack is not None:
+                self._write_sidecar(services_data, stat)
+    
+    def _mark_dirty(self) -> None:
+        """Schedule the services to be written to storage."""
+        self._dirty.set()
+    
+    def _flush_now(self) -> None:
+        """Write pending changes to storage immediately."""
+        # Hold the save lock for the check as well, so a write the flusher
+        # thread has already claimed is finished before this returns
+        with self._save_lock:
+            if not self._dirty.is_set():
+                return
+            
+            self._dirty.clear()
+            self._save_services()
+    
+    def _start_flusher_thread(self) -> None:
+        """Start the thread that writes pending changes to storage."""
+        if self._flusher_thread is not None and self._flusher_thread.is_alive():
+            return
         
-        with open(self.storage_path, 'w') as f:
-            json.dump(services_data, f, indent=2)
+        self._stop_flusher.clear()
+        self._flusher_thread = threading.Thread(
+            target=self._flusher_worker,
+            daemon=True
+        )
+        self._flusher_thread.start()
+    
+    def _flusher_worker(self) -> None:
+        """Worker thread that coalesces changes into periodic writes."""
+        while not self._stop_flusher.is_set():
+            self._dirty.wait()
+            # Let further changes accumulate before writing
+            self._stop_flusher.wait(self.flush_interval)
+            try:
+                self._flush_now()
+            except OSError:
+                pass
     
     def _start_health_check_thread(self) -> None:
         """Start the health check thread."""
@@ -133,13 +519,83 @@ class ServiceRegistry:
     
     def _check_all_services_health(self) -> None:
         """Check the health of all registered services."""
-        for service_id, service in list(self.services.items()):
-            if service.health_endpoint:
-                try:
-                    self._check_service_health(service)
-                except Exception as e:
-                    service.health_status = "unhealthy"
-                    service.last_health_check = time.time()
+        services = [
+            service for service in self._snapshot
+            if service.health_endpoint
+        ]
+        if not services:
+            # Nothing to check; don't set up the event loop and session
+            return
+        if len(services) == 1:
+            self._safe_check_service_health(services[0])
+        elif _load_aiohttp() is not None:
+            self._check_services_health_async(services)
+        else:
+            list(self._health_pool.map(self._safe_check_service_health, services))
+    
+    def _check_services_health_async(self, services: List[ServiceInfo]) -> None:
+        """
+        Check the health of several services concurrently on an event loop.
+        
+        Args:
+            services: Services to check
+        """
+        import asyncio
+        
+        with self._async_lock:
+            if self._async_loop is None:
+                self._async_loop = asyncio.new_event_loop()
+            self._async_loop.run_until_complete(self._acheck_all(services))
+    
+    async def _acheck_all(self, services: List[ServiceInfo]) -> None:
+        """
+        Check the health of services using a shared aiohttp session.
+        
+        Args:
+            services: Services to check
+        """
+        import asyncio
+        
+        aiohttp = _load_aiohttp()
+        if self._aiohttp is None:
+            self._aiohttp = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=256),
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        
+        await asyncio.gather(*(self._acheck(service) for service in services))
+    
+    async def _acheck(self, service: ServiceInfo) -> None:
+        """
+        Check the health of a specific service asynchronously.
+        
+        Args:
+            service: Service to check
+        """
+        try:
+            health_url = f"{service.url}{service.health_endpoint}"
+            async with self._aiohttp.get(health_url) as response:
+                if response.status == 200:
+                    service.health_status = HealthStatus.HEALTHY
+                else:
+                    service.health_status = HealthStatus.UNHEALTHY
+        except Exception:
+            service.health_status = HealthStatus.UNHEALTHY
+        
+        service.last_health_check = time.time()
+    
+    def _safe_check_service_health(self, service: ServiceInfo) -> None:
+        """
+        Check the health of a service, marking it unhealthy on any error.
+        
+        Args:
+            service: Service to check
+        """
+        try:
+            self._check_service_health(service)
+        except Exception:
+            service.health_status = HealthStatus.UNHEALTHY
+            service.last_health_check = time.time()
     
     def _check_service_health(self, service: ServiceInfo) -> None:
         """
@@ -153,16 +609,16 @@ class ServiceRegistry:
             
         try:
             health_url = f"{service.url}{service.health_endpoint}"
-            response = requests.get(health_url, timeout=5)
+            response = self._http.get(health_url, timeout=5)
             
             if response.status_code == 200:
-                service.health_status = "healthy"
+                service.health_status = HealthStatus.HEALTHY
             else:
-                service.health_status = "unhealthy"
+                service.health_status = HealthStatus.UNHEALTHY
                 
             service.last_health_check = time.time()
         except requests.RequestException:
-            service.health_status = "unhealthy"
+            service.health_status = HealthStatus.UNHEALTHY
             service.last_health_check = time.time()
     
     def register_service(self, service: ServiceInfo) -> None:
@@ -172,8 +628,18 @@ class ServiceRegistry:
         Args:
             service: Service information to register
         """
-        self.services[service.service_id] = service
-        self._save_services()
+        with self._snapshot_lock:
+            services = dict(self._services)
+            services[service.service_id] = service
+            
+            app_services = dict(self._by_app.get(service.app_id, {}))
+            app_services[service.service_id] = None
+            self._by_app[service.app_id] = app_services
+            
+            self._services = services
+            self._snapshot = tuple(services.values())
+        
+        self._mark_dirty()
     
     def unregister_service(self, app_id: str, instance_id: str) -> None:
         """
@@ -184,9 +650,24 @@ class ServiceRegistry:
             instance_id: Instance ID
         """
         service_id = f"{app_id}:{instance_id}"
-        if service_id in self.services:
-            del self.services[service_id]
-            self._save_services()
+        with self._snapshot_lock:
+            if service_id not in self._services:
+                return
+            
+            services = dict(self._services)
+            del services[service_id]
+            
+            app_services = dict(self._by_app.get(app_id, {}))
+            app_services.pop(service_id, None)
+            if app_services:
+                self._by_app[app_id] = app_services
+            else:
+                self._by_app.pop(app_id, None)
+            
+            self._services = services
+            self._snapshot = tuple(services.values())
+        
+        self._mark_dirty()
     
     def get_service(self, app_id: str, instance_id: str) -> Optional[ServiceInfo]:
         """
@@ -209,7 +690,7 @@ class ServiceRegistry:
         Returns:
             List of all registered services
         """
-        return list(self.services.values())
+        return list(self._snapshot)
     
     def get_services_by_app(self, app_id: str) -> List[ServiceInfo]:
         """
@@ -221,9 +702,11 @@ class ServiceRegistry:
         Returns:
             List of services for the application
         """
+        services = self._services
         return [
-            service for service in self.services.values()
-            if service.app_id == app_id
+            services[service_id]
+            for service_id in self._by_app.get(app_id, ())
+            if service_id in services
         ]
     
     def update_service_status(
@@ -241,9 +724,11 @@ class ServiceRegistry:
             status: New status (unknown, starting, running, stopped, error)
         """
         service_id = f"{app_id}:{instance_id}"
-        if service_id in self.services:
-            self.services[service_id].status = status
-            self._save_services()
+        # Services are shared with the snapshot, so only the object changes
+        service = self.services.get(service_id)
+        if service is not None:
+            service.status = status
+            self._mark_dirty()
     
     def get_dependency_order(self) -> List[Set[str]]:
         """
@@ -253,40 +738,32 @@ class ServiceRegistry:
             List of sets of service IDs, where each set contains services
             that can be started in parallel
         """
-        # Build dependency graph
-        graph: Dict[str, Set[str]] = {}
-        reverse_graph: Dict[str, Set[str]] = {}
+        # Count unmet dependencies and index dependents in a single pass
+        indegree: Dict[str, int] = {}
+        dependents: Dict[str, List[str]] = {}
         
         for service_id, service in self.services.items():
-            graph[service_id] = set()
+            deps = set(service.dependencies)
+            indegree[service_id] = len(deps)
             
-            for dep in service.dependencies:
-                graph[service_id].add(dep)
-                
-                if dep not in reverse_graph:
-                    reverse_graph[dep] = set()
-                    
-                reverse_graph[dep].add(service_id)
+            for dep in deps:
+                dependents.setdefault(dep, []).append(service_id)
         
-        # Topological sort
+        # Kahn's algorithm, one level at a time
         result: List[Set[str]] = []
-        no_deps = {
-            service_id for service_id in graph
-            if not graph[service_id]
-        }
+        frontier = [service_id for service_id, count in indegree.items() if count == 0]
         
-        while no_deps:
-            result.append(no_deps)
+        while frontier:
+            result.append(set(frontier))
             
-            next_no_deps = set()
-            for service_id in no_deps:
-                if service_id in reverse_graph:
-                    for dependent in reverse_graph[service_id]:
-                        graph[dependent].remove(service_id)
-                        if not graph[dependent]:
-                            next_no_deps.add(dependent)
+            next_frontier = []
+            for service_id in frontier:
+                for dependent in dependents.get(service_id, ()):
+                    indegree[dependent] -= 1
+                    if indegree[dependent] == 0:
+                        next_frontier.append(dependent)
             
-            no_deps = next_no_deps
+            frontier = next_frontier
         
         return result
     
@@ -296,4 +773,23 @@ class ServiceRegistry:
             self.stop_health_check.set()
             self.health_check_thread.join(timeout=1)
         
+        if self._flusher_thread and self._flusher_thread.is_alive():
+            self._stop_flusher.set()
+            # Wake the flusher if it is waiting for changes
+            self._dirty.set()
+            self._flusher_thread.join(timeout=1)
+        
+        self._dirty.clear()
         self._save_services()
+        _live_registries.discard(self)
+        
+        self._health_pool.shutdown(wait=False)
+        self._http.close()
+        
+        with self._async_lock:
+            if self._async_loop is not None:
+                if self._aiohttp is not None:
+                    self._async_loop.run_until_complete(self._aiohttp.close())
+                    self._aiohttp = None
+                self._async_loop.close()
+                self._async_loop = None
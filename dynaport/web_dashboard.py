@@ -6,23 +6,32 @@ DynaPort services and port allocations.
 """
 
 import os
-import json
+import time
+import functools
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for
+from flask import Flask, render_template, request
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
 from .port_allocator import PortAllocator
 from .service_registry import ServiceRegistry, ServiceInfo
 from .config_manager import ConfigManager
 from .flask_integration import DynaPortFlask
+from ._json import OrjsonProvider, json_response
 
 
 def create_dashboard_app(
     port_allocator: Optional[PortAllocator] = None,
     service_registry: Optional[ServiceRegistry] = None,
     config_manager: Optional[ConfigManager] = None,
-    preferred_port: int = 7000
+    preferred_port: int = 7000,
+    cache_ttl: float = 2.0,
+    skip_assets: bool = False
 ) -> Flask:
     """
     Create a Flask application for the DynaPort dashboard.
@@ -32,6 +41,8 @@ def create_dashboard_app(
         service_registry: Service registry instance (created if None)
         config_manager: Configuration manager instance (created if None)
         preferred_port: Preferred port for the dashboard
+        cache_ttl: Seconds to serve cached bodies of the read-only API endpoints
+        skip_assets: Don't write the template and static files to disk
         
     Returns:
         Flask application for the dashboard
@@ -47,16 +58,46 @@ def create_dashboard_app(
         template_folder=str(Path(__file__).parent / "templates"),
         static_folder=str(Path(__file__).parent / "static")
     )
+    if orjson is not None:
+        # Parse request bodies with orjson as well
+        app.json = OrjsonProvider(app)
+    
+    if not skip_assets:
+        # Create templates and static directories if they don't exist
+        templates_dir = Path(__file__).parent / "templates"
+        static_dir = Path(__file__).parent / "static"
+        templates_dir.mkdir(exist_ok=True)
+        static_dir.mkdir(exist_ok=True)
+        
+        # Create basic templates
+        _create_templates(templates_dir)
+        _create_static_files(static_dir)
     
-    # Create templates and static directories if they don't exist
-    templates_dir = Path(__file__).parent / "templates"
-    static_dir = Path(__file__).parent / "static"
-    templates_dir.mkdir(exist_ok=True)
-    static_dir.mkdir(exist_ok=True)
+    # Response bodies of the read-only endpoints, keyed by path and query
+    response_cache: Dict[Tuple[str, bytes], Tuple[float, bytes]] = {}
     
-    # Create basic templates
-    _create_templates(templates_dir)
-    _create_static_files(static_dir)
+    def cached_get(view):
+        """Serve the JSON body of a GET view from the cache for ``cache_ttl`` seconds."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, request.query_string)
+            now = time.monotonic()
+            entry = response_cache.get(key)
+            if entry is not None and entry[0] > now:
+                body = entry[1]
+            else:
+                try:
+                    body = view(*args, **kwargs).get_data()
+                except Exception:
+                    if entry is None:
+                        raise
+                    # Serve the stale copy rather than failing the request
+                    body = entry[1]
+                else:
+                    response_cache[key] = (now + cache_ttl, body)
+            return app.response_class(body, mimetype='application/json')
+        
+        return wrapper
     
     # Set up routes
     @app.route('/')
@@ -65,54 +106,64 @@ def create_dashboard_app(
         return render_template('index.html')
     
     @app.route('/api/services')
+    @cached_get
     def api_services():
         """API endpoint for services data."""
         services = service_registry.get_all_services()
-        return jsonify({
-            "services": [service.to_dict() for service in services]
+        return json_response({
+            "services": [service.to_builtins() for service in services]
         })
     
     @app.route('/api/ports')
+    @cached_get
     def api_ports():
         """API endpoint for port allocation data."""
-        assignments = port_allocator.get_all_assignments()
-        return jsonify({
+        # Copy the live view once, so a concurrent release can't change it
+        # between the availability check and building the response
+        assignments = dict(port_allocator.get_all_assignments())
+        availability = port_allocator.availability(assignments.values())
+        return json_response({
             "assignments": {
                 app_id: {
                     "port": port,
-                    "available": port_allocator.is_port_available(port)
+                    "available": available
                 }
-                for app_id, port in assignments.items()
+                for (app_id, port), available in zip(assignments.items(), availability)
             }
         })
     
     @app.route('/api/config')
+    @cached_get
     def api_config():
         """API endpoint for configuration data."""
-        return jsonify({
+        return json_response({
             "config": config_manager.config
         })
     
     @app.route('/api/service/<app_id>/<instance_id>/status', methods=['POST'])
     def api_update_service_status(app_id, instance_id):
         """API endpoint to update service status."""
-        status = request.json.get('status')
+        data = request.get_json(silent=True)
+        status = data.get('status') if isinstance(data, dict) else None
         if status:
             service_registry.update_service_status(app_id, instance_id, status)
-            return jsonify({"success": True})
-        return jsonify({"success": False, "error": "No status provided"}), 400
+            response_cache.clear()
+            return json_response({"success": True})
+        return json_response({"success": False, "error": "No status provided"}, status=400)
     
     @app.route('/api/port/release/<app_id>', methods=['POST'])
     def api_release_port(app_id):
         """API endpoint to release a port."""
         port_allocator.release_port(app_id)
-        return jsonify({"success": True})
+        response_cache.clear()
+        return json_response({"success": True})
     
     @app.route('/api/service/unregister/<app_id>/<instance_id>', methods=['POST'])
     def api_unregister_service(app_id, instance_id):
         """API endpoint to unregister a service."""
         service_registry.unregister_service(app_id, instance_id)
-        return jsonify({"success": True})
+        response_cache.clear()
+        return json_response({"success": True})
     
     # Create DynaPort integration
     dynaport = DynaPortFlask(
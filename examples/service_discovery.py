@@ -8,7 +8,7 @@ to find and communicate with other services.
 import requests
 from flask import Flask, jsonify, request
 from dynaport.flask_integration import DynaPortFlask
-from dynaport.service_registry import ServiceRegistry
+from dynaport.service_registry import ServiceRegistry, HealthStatus
 
 
 # Create a Flask application
@@ -29,7 +29,7 @@ def index():
                 "name": service.name,
                 "url": service.url,
                 "status": service.status,
-                "health": service.health_status
+                "health": str(service.health_status)
             }
             for service in registry.get_all_services()
         ]
@@ -61,7 +61,7 @@ def proxy_request(app_id, endpoint):
     
     # Use the first healthy service
     service = next(
-        (s for s in services if s.health_status == "healthy"),
+        (s for s in services if s.health_status == HealthStatus.HEALTHY),
         services[0]  # Fall back to first service if none are healthy
     )
     
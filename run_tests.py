@@ -13,10 +13,14 @@ def main():
     """Run the DynaPort tests."""
     print("Running DynaPort tests...")
     
-    # Run pytest with coverage
+    # Run pytest with coverage, spreading test classes across all CPU cores
     try:
         subprocess.run(
-            [sys.executable, "-m", "pytest", "--cov=dynaport", "--cov-report=term"],
+            [
+                sys.executable, "-m", "pytest",
+                "-n", "auto", "--dist", "loadscope",
+                "--cov=dynaport", "--cov-report=term"
+            ],
             check=True
         )
     except subprocess.CalledProcessError:
@@ -48,18 +48,24 @@ setup(
         "requests>=2.25.0",
     ],
     extras_require={
-        "flask": ["flask>=2.0.0"],
+        "flask": ["flask>=2.2.0"],
         "django": ["django>=3.2.0"],
         "fastapi": ["fastapi>=0.68.0", "uvicorn>=0.15.0"],
+        "fast": ["orjson>=3.0.0", "aiohttp>=3.8.0", "ijson>=3.1.0", "msgpack>=1.0.0"],
         "all": [
-            "flask>=2.0.0",
+            "flask>=2.2.0",
             "django>=3.2.0",
             "fastapi>=0.68.0",
             "uvicorn>=0.15.0",
+            "orjson>=3.0.0",
+            "aiohttp>=3.8.0",
+            "ijson>=3.1.0",
+            "msgpack>=1.0.0",
         ],
         "dev": [
             "pytest>=6.0.0",
             "pytest-cov>=2.12.0",
+            "pytest-xdist>=2.5.0",
             "black>=21.5b2",
             "isort>=5.9.0",
             "mypy>=0.812",
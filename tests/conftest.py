@@ -3,10 +3,13 @@ Pytest configuration and fixtures.
 """
 
 import os
+import json
+import shutil
 import tempfile
 from pathlib import Path
 
 import pytest
+import yaml
 from flask import Flask
 
 from dynaport.port_allocator import PortAllocator
@@ -15,6 +18,49 @@ from dynaport.config_manager import ConfigManager
 from dynaport.flask_integration import DynaPortFlask
 
 
+GOLDEN_DIR = Path(__file__).parent / "fixtures"
+
+
+def pytest_addoption(parser):
+    """Add the option to rewrite golden response files."""
+    parser.addoption(
+        "--update-goldens",
+        action="store_true",
+        default=False,
+        help="Rewrite the golden files under tests/fixtures instead of comparing against them"
+    )
+
+
+def pytest_sessionstart(session):
+    """Initialize the YAML loader before any test runs."""
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    yaml.load("x: 1", Loader=loader)
+
+
+@pytest.fixture
+def golden(pytestconfig):
+    """
+    Compare bytes against a golden file in tests/fixtures.
+    
+    With --update-goldens the file is rewritten from the given bytes instead.
+    Passing ``exact=False`` compares the parsed JSON, for bytes written by a
+    serializer other than the one that produced the golden file.
+    """
+    update = pytestconfig.getoption("--update-goldens")
+    
+    def check(name, data, exact=True):
+        path = GOLDEN_DIR / name
+        if not exact:
+            assert json.loads(data) == json.loads(path.read_bytes())
+            return
+        if update:
+            GOLDEN_DIR.mkdir(exist_ok=True)
+            path.write_bytes(data)
+        assert data == path.read_bytes()
+    
+    return check
+
+
 @pytest.fixture
 def temp_dir():
     """Create a temporary directory for tests."""
@@ -22,11 +68,30 @@ def temp_dir():
         yield Path(temp_dir)
 
 
+@pytest.fixture(scope="session")
+def config_root(tmp_path_factory):
+    """Create a configuration directory shared by the whole test session."""
+    return tmp_path_factory.mktemp("cfg")
+
+
+@pytest.fixture
+def config_dir(config_root):
+    """Provide an empty configuration directory for a test."""
+    for path in config_root.iterdir():
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    yield config_root
+
+
 @pytest.fixture
 def port_allocator(temp_dir):
     """Create a PortAllocator instance for tests."""
     storage_path = temp_dir / "ports.json"
-    return PortAllocator(storage_path=str(storage_path))
+    allocator = PortAllocator(storage_path=str(storage_path))
+    yield allocator
+    allocator.close()
 
 
 @pytest.fixture
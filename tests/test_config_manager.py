@@ -3,47 +3,81 @@ Unit tests for the configuration manager module.
 """
 
 import os
+import time
+import signal
 import yaml
-import tempfile
 from pathlib import Path
+from typing import List, Tuple
 from unittest import mock
 
 import pytest
 
 from dynaport.config_manager import ConfigManager
 
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Pre-serialized YAML for the configuration fixtures shared by several tests
+BASE_CFG_BYTES = b"port_allocator:\n  port_range:\n  - 8000\n  - 9000\n"
+ENV_CFG_BYTES = b"port_allocator:\n  port_range:\n  - 7000\n  - 8000\n"
+APP_CFG_BYTES = b"app_specific:\n  setting: value\n"
+APP_OVERRIDE_CFG_BYTES = (
+    b"app_specific:\n  setting: value\n"
+    b"port_allocator:\n  port_range:\n  - 5000\n  - 6000\n"
+)
+ENV_APP_CFG_BYTES = b"app_specific:\n  setting: production-value\n"
+INSTANCE_CFG_BYTES = b"instance_specific:\n  setting: instance-value\n"
+
+
+def _write_fixtures_batch(pairs: List[Tuple[Path, bytes]]) -> None:
+    """Write several fixture files, opening them all before issuing the writes."""
+    if len(pairs) < 2:
+        for path, data in pairs:
+            path.write_bytes(data)
+        return
+
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fds = [os.open(path, flags, 0o644) for path, _ in pairs]
+    try:
+        for fd, (_, data) in zip(fds, pairs):
+            os.write(fd, data)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
 
 class TestConfigManager:
     """Test cases for the ConfigManager class."""
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _config_dir(self, config_dir):
         """Set up test environment before each test."""
-        # Create a temporary directory for configuration files
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.config_dir = Path(self.temp_dir.name)
+        # Configuration files go in the session-wide, per-test emptied directory
+        self.config_dir = config_dir
 
-    def teardown_method(self):
-        """Clean up test environment after each test."""
-        self.temp_dir.cleanup()
+    @pytest.fixture
+    def _no_default_config(self, monkeypatch):
+        """Skip creating the default configuration file."""
+        monkeypatch.setattr(ConfigManager, '_ensure_default_config', lambda self: None)
 
+    @pytest.mark.usefixtures("_no_default_config")
     def test_init_default_values(self):
         """Test initialization with default values."""
-        with mock.patch.object(ConfigManager, '_ensure_default_config'):
-            with mock.patch.object(ConfigManager, '_load_config', return_value={}):
-                config_manager = ConfigManager()
-                assert config_manager.environment == "development"
-                assert config_manager.config == {}
+        with mock.patch.object(ConfigManager, '_load_config', return_value={}):
+            config_manager = ConfigManager()
+            assert config_manager.environment == "development"
+            assert config_manager.config == {}
 
+    @pytest.mark.usefixtures("_no_default_config")
     def test_init_custom_values(self):
         """Test initialization with custom values."""
-        with mock.patch.object(ConfigManager, '_ensure_default_config'):
-            config_manager = ConfigManager(
-                config_dir=str(self.config_dir),
-                environment="production"
-            )
-            assert config_manager.environment == "production"
-            assert config_manager.config_dir == self.config_dir
-            assert config_manager.config == {}
+        config_manager = ConfigManager(
+            config_dir=str(self.config_dir),
+            environment="production"
+        )
+        assert config_manager.environment == "production"
+        assert config_manager.config_dir == self.config_dir
+        assert config_manager.config == {}
 
     def test_ensure_default_config(self):
         """Test creating default configuration."""
@@ -55,7 +89,7 @@ class TestConfigManager:
 
         # Check the content of the default config
         with open(default_config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=Loader)
 
         assert "port_allocator" in config
         assert "port_range" in config["port_allocator"]
@@ -74,7 +108,7 @@ class TestConfigManager:
 
         test_config_path = self.config_dir / "test.yaml"
         with open(test_config_path, 'w') as f:
-            yaml.dump(test_config, f)
+            yaml.dump(test_config, f, Dumper=Dumper, sort_keys=False, default_flow_style=True)
 
         # Load the config
         config_manager = ConfigManager(config_dir=str(self.config_dir))
@@ -82,6 +116,33 @@ class TestConfigManager:
 
         assert loaded_config == test_config
 
+    def test_load_config_json_cache(self):
+        """Test that loaded configuration is cached as JSON next to the YAML file."""
+        (self.config_dir / "test.yaml").write_bytes(APP_CFG_BYTES)
+
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        assert config_manager._load_config("test") == {"app_specific": {"setting": "value"}}
+        assert (self.config_dir / ".test.json.cache").exists()
+
+        # The second load is served from the JSON cache
+        with mock.patch('yaml.load') as mock_yaml_load:
+            assert config_manager._load_config("test") == {"app_specific": {"setting": "value"}}
+            mock_yaml_load.assert_not_called()
+
+        # Changing the YAML file invalidates the cache
+        (self.config_dir / "test.yaml").write_bytes(INSTANCE_CFG_BYTES)
+        assert config_manager._load_config("test") == {"instance_specific": {"setting": "instance-value"}}
+
+    def test_load_config_json_cache_skipped(self):
+        """Test that configuration JSON can't represent is not cached."""
+        (self.config_dir / "test.yaml").write_text("1: one\nwhen: 2024-01-01\n")
+
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        loaded_config = config_manager._load_config("test")
+
+        assert loaded_config[1] == "one"
+        assert not (self.config_dir / ".test.json.cache").exists()
+
     def test_load_config_nonexistent_file(self):
         """Test loading configuration from a nonexistent file."""
         config_manager = ConfigManager(config_dir=str(self.config_dir))
@@ -125,51 +186,52 @@ class TestConfigManager:
 
         assert base_config == expected_result
 
+    def test_merge_layers(self):
+        """Test merging flat and nested configuration layers."""
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+
+        # Flat layers use the specialized merge
+        base = {"port_allocator": {"port_range": [8000, 9000], "reserved_ports": []}}
+        app = {"port_allocator": {"port_range": [5000, 6000]}, "app_specific": {"setting": "value"}}
+
+        result = config_manager._merge_layers([base, app])
+
+        assert result == {
+            "port_allocator": {"port_range": [5000, 6000], "reserved_ports": []},
+            "app_specific": {"setting": "value"}
+        }
+        assert base == {"port_allocator": {"port_range": [8000, 9000], "reserved_ports": []}}
+
+        # Nested layers fall back to the generic merge
+        nested = {"app_specific": {"nested": {"a": 1}}, "debug": True}
+
+        result = config_manager._merge_layers([base, app, nested])
+
+        assert result == {
+            "port_allocator": {"port_range": [5000, 6000], "reserved_ports": []},
+            "app_specific": {"setting": "value", "nested": {"a": 1}},
+            "debug": True
+        }
+        assert base == {"port_allocator": {"port_range": [8000, 9000], "reserved_ports": []}}
+
     def test_get_app_config_base_only(self):
         """Test getting application configuration with only base config."""
         # Create base config
-        base_config = {
-            "port_allocator": {
-                "port_range": [8000, 9000]
-            }
-        }
-
-        base_config_path = self.config_dir / "default.yaml"
-        with open(base_config_path, 'w') as f:
-            yaml.dump(base_config, f)
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
 
         # Get app config
         config_manager = ConfigManager(config_dir=str(self.config_dir))
         app_config = config_manager.get_app_config("test-app")
 
-        assert app_config == base_config
+        assert app_config == {"port_allocator": {"port_range": [8000, 9000]}}
 
     def test_get_app_config_with_app_specific(self):
         """Test getting application configuration with app-specific config."""
         # Create base config
-        base_config = {
-            "port_allocator": {
-                "port_range": [8000, 9000]
-            }
-        }
-
-        base_config_path = self.config_dir / "default.yaml"
-        with open(base_config_path, 'w') as f:
-            yaml.dump(base_config, f)
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
 
         # Create app-specific config
-        app_config = {
-            "port_allocator": {
-                "port_range": [5000, 6000]
-            },
-            "app_specific": {
-                "setting": "value"
-            }
-        }
-
-        app_config_path = self.config_dir / "app_test-app.yaml"
-        with open(app_config_path, 'w') as f:
-            yaml.dump(app_config, f)
+        (self.config_dir / "app_test-app.yaml").write_bytes(APP_OVERRIDE_CFG_BYTES)
 
         # Get app config
         config_manager = ConfigManager(config_dir=str(self.config_dir))
@@ -188,49 +250,13 @@ class TestConfigManager:
 
     def test_get_app_config_with_env_specific(self):
         """Test getting application configuration with environment-specific config."""
-        # Create base config
-        base_config = {
-            "port_allocator": {
-                "port_range": [8000, 9000]
-            }
-        }
-
-        base_config_path = self.config_dir / "default.yaml"
-        with open(base_config_path, 'w') as f:
-            yaml.dump(base_config, f)
-
-        # Create environment-specific config
-        env_config = {
-            "port_allocator": {
-                "port_range": [7000, 8000]
-            }
-        }
-
-        env_config_path = self.config_dir / "production.yaml"
-        with open(env_config_path, 'w') as f:
-            yaml.dump(env_config, f)
-
-        # Create app-specific config
-        app_config = {
-            "app_specific": {
-                "setting": "value"
-            }
-        }
-
-        app_config_path = self.config_dir / "app_test-app.yaml"
-        with open(app_config_path, 'w') as f:
-            yaml.dump(app_config, f)
-
-        # Create environment-specific app config
-        env_app_config = {
-            "app_specific": {
-                "setting": "production-value"
-            }
-        }
-
-        env_app_config_path = self.config_dir / "app_test-app_production.yaml"
-        with open(env_app_config_path, 'w') as f:
-            yaml.dump(env_app_config, f)
+        # Create base, environment, app and environment-specific app configs
+        _write_fixtures_batch([
+            (self.config_dir / "default.yaml", BASE_CFG_BYTES),
+            (self.config_dir / "production.yaml", ENV_CFG_BYTES),
+            (self.config_dir / "app_test-app.yaml", APP_CFG_BYTES),
+            (self.config_dir / "app_test-app_production.yaml", ENV_APP_CFG_BYTES)
+        ])
 
         # Get app config
         config_manager = ConfigManager(
@@ -253,37 +279,13 @@ class TestConfigManager:
     def test_get_app_config_with_instance_specific(self):
         """Test getting application configuration with instance-specific config."""
         # Create base config
-        base_config = {
-            "port_allocator": {
-                "port_range": [8000, 9000]
-            }
-        }
-
-        base_config_path = self.config_dir / "default.yaml"
-        with open(base_config_path, 'w') as f:
-            yaml.dump(base_config, f)
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
 
         # Create app-specific config
-        app_config = {
-            "app_specific": {
-                "setting": "value"
-            }
-        }
-
-        app_config_path = self.config_dir / "app_test-app.yaml"
-        with open(app_config_path, 'w') as f:
-            yaml.dump(app_config, f)
+        (self.config_dir / "app_test-app.yaml").write_bytes(APP_CFG_BYTES)
 
         # Create instance-specific config
-        instance_config = {
-            "instance_specific": {
-                "setting": "instance-value"
-            }
-        }
-
-        instance_config_path = self.config_dir / "instance_test-app_instance1.yaml"
-        with open(instance_config_path, 'w') as f:
-            yaml.dump(instance_config, f)
+        (self.config_dir / "instance_test-app_instance1.yaml").write_bytes(INSTANCE_CFG_BYTES)
 
         # Get app config
         config_manager = ConfigManager(config_dir=str(self.config_dir))
@@ -303,6 +305,74 @@ class TestConfigManager:
 
         assert result == expected_result
 
+    def test_get_app_config_cached(self):
+        """Test that repeated lookups are served from the cache."""
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
+        (self.config_dir / "app_test-app.yaml").write_bytes(APP_CFG_BYTES)
+
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        first = config_manager.get_app_config("test-app")
+
+        with mock.patch.object(ConfigManager, '_load_config') as mock_load_config:
+            second = config_manager.get_app_config("test-app")
+            mock_load_config.assert_not_called()
+
+        assert second == first
+
+        # Callers get their own copy
+        second["app_specific"]["setting"] = "changed"
+        assert config_manager.get_app_config("test-app")["app_specific"]["setting"] == "value"
+        assert "app_specific" not in config_manager.config
+
+    def test_get_app_config_cache_invalidation(self):
+        """Test that the cache is invalidated when configuration changes."""
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
+
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        assert "app_specific" not in config_manager.get_app_config("test-app")
+
+        # A file written outside the manager changes the file signature
+        (self.config_dir / "app_test-app.yaml").write_bytes(APP_CFG_BYTES)
+        assert config_manager.get_app_config("test-app")["app_specific"] == {"setting": "value"}
+
+        # Saving through the manager invalidates the cache
+        config_manager.save_app_config("test-app", {"app_specific": {"setting": "saved"}})
+        assert config_manager.get_app_config("test-app")["app_specific"] == {"setting": "saved"}
+
+        config_manager.set_config_value("port_allocator.port_range", [5000, 6000])
+        assert config_manager.get_app_config("test-app")["port_allocator"]["port_range"] == [5000, 6000]
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_get_app_config_after_fork(self):
+        """Test that a forked child can read configuration loaded by its parent."""
+        (self.config_dir / "default.yaml").write_bytes(BASE_CFG_BYTES)
+        (self.config_dir / "app_b.yaml").write_bytes(APP_CFG_BYTES)
+
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        config_manager.get_app_config("a")
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            code = 1
+            try:
+                if config_manager.get_app_config("b")["app_specific"] == {"setting": "value"}:
+                    code = 0
+            finally:
+                os._exit(code)
+
+        # Reap the child, giving up if it hangs
+        for _ in range(100):
+            waited, status = os.waitpid(pid, os.WNOHANG)
+            if waited:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            pytest.fail("get_app_config hung in the forked child")
+
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
     def test_save_app_config(self):
         """Test saving application configuration."""
         config_manager = ConfigManager(config_dir=str(self.config_dir))
@@ -325,7 +395,7 @@ class TestConfigManager:
 
         # Check the content of the file
         with open(app_config_path, 'r') as f:
-            saved_config = yaml.safe_load(f)
+            saved_config = yaml.load(f, Loader=Loader)
 
         assert saved_config == app_config
 
@@ -352,7 +422,7 @@ class TestConfigManager:
 
         # Check the content of the file
         with open(instance_config_path, 'r') as f:
-            saved_config = yaml.safe_load(f)
+            saved_config = yaml.load(f, Loader=Loader)
 
         assert saved_config == app_config
 
@@ -382,7 +452,7 @@ class TestConfigManager:
 
         # Check the content of the file
         with open(env_app_config_path, 'r') as f:
-            saved_config = yaml.safe_load(f)
+            saved_config = yaml.load(f, Loader=Loader)
 
         assert saved_config == app_config
 
@@ -407,6 +477,19 @@ class TestConfigManager:
         assert config_manager.get_config_value("nonexistent", "default") == "default"
         assert config_manager.get_config_value("port_allocator.nonexistent", 42) == 42
 
+    def test_get_path(self):
+        """Test getting a configuration value with a pre-split key path."""
+        config_manager = ConfigManager(config_dir=str(self.config_dir))
+        config_manager.config = {
+            "port_allocator": {
+                "port_range": [8000, 9000]
+            }
+        }
+
+        assert config_manager.get_path(("port_allocator", "port_range")) == [8000, 9000]
+        assert config_manager.get_path(("port_allocator", "port_range", "x"), 42) == 42
+        assert config_manager.get_path(("nonexistent",)) is None
+
     def test_set_config_value(self):
         """Test setting a specific configuration value."""
         config_manager = ConfigManager(config_dir=str(self.config_dir))
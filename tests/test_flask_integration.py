@@ -2,7 +2,6 @@
 Unit tests for the Flask integration module.
 """
 
-import json
 from unittest import mock
 
 import pytest
@@ -30,7 +29,7 @@ class TestDynaPortFlask:
     
     def test_init_default_values(self):
         """Test initialization with default values."""
-        with mock.patch('uuid.uuid4', return_value="test-uuid"):
+        with mock.patch('dynaport.flask_integration._gen_instance_id', return_value="test-uuid"):
             dynaport = DynaPortFlask(
                 app_id="test-app",
                 port_allocator=self.mock_port_allocator,
@@ -50,7 +49,8 @@ class TestDynaPortFlask:
             # Verify port allocation
             self.mock_port_allocator.allocate_port.assert_called_once_with(
                 app_id="test-app:test-uuid",
-                preferred_port=None
+                preferred_port=None,
+                hold=True
             )
             
             # Verify service registration
@@ -86,7 +86,8 @@ class TestDynaPortFlask:
         # Verify port allocation
         self.mock_port_allocator.allocate_port.assert_called_once_with(
             app_id="test-app:custom-instance",
-            preferred_port=8080
+            preferred_port=8080,
+            hold=True
         )
         
         # Verify service registration
@@ -123,6 +124,11 @@ class TestDynaPortFlask:
         assert app.dynaport is dynaport
         assert app.config['PORT'] == 8000
         
+        # Verify the held port was handed over to the app
+        self.mock_port_allocator.release_reservation.assert_called_once_with(
+            f"test-app:{dynaport.instance_id}"
+        )
+        
         # Verify service status update
         self.mock_service_registry.update_service_status.assert_called_once_with(
             app_id="test-app",
@@ -130,20 +136,19 @@ class TestDynaPortFlask:
             status="running"
         )
         
-        # Verify health endpoint was added
         with app.test_client() as client:
+            # Verify health endpoint was added
             response = client.get('/health')
             assert response.status_code == 200
-            data = json.loads(response.data)
+            data = response.get_json()
             assert data["status"] == "healthy"
             assert data["app_id"] == "test-app"
             assert data["port"] == 8000
-        
-        # Verify DynaPort blueprint was added
-        with app.test_client() as client:
+            
+            # Verify DynaPort blueprint was added
             response = client.get('/dynaport/info')
             assert response.status_code == 200
-            data = json.loads(response.data)
+            data = response.get_json()
             assert data["app_id"] == "test-app"
             assert data["port"] == 8000
     
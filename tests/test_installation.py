@@ -10,13 +10,23 @@ This script tests the basic functionality of DynaPort by:
 
 import sys
 import time
+import socket
 import threading
+
+import pytest
 import requests
 from flask import Flask, jsonify
+from werkzeug.serving import make_server
 
 from dynaport.core.port_allocator import PortAllocator
 from dynaport.adapters.flask_adapter import DynaPortFlask
 
+# Shared by both tests so the port state is loaded only once
+_allocator = PortAllocator()
+
+# Reuse one HTTP connection pool for requests against the test server
+_session = requests.Session()
+
 
 def create_test_app():
     """Create a simple test Flask application."""
@@ -32,140 +42,89 @@ def create_test_app():
     return app
 
 
-def run_test_app(app, port, ready_event):
-    """Run the test application in a separate thread."""
-    def run():
-        # Use the port from the app's config if not specified
-        actual_port = port or app.config.get('PORT', 5000)
-        app.run(host='127.0.0.1', port=actual_port)
-
-    thread = threading.Thread(target=run)
+def run_test_app(app, port):
+    """Run the test application in a separate thread until it accepts connections."""
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
     thread.daemon = True
     thread.start()
 
-    # Wait for the application to start
-    max_attempts = 10
+    # Wait for the application to start listening; the caller makes the
+    # real HTTP request once the port accepts connections
+    max_attempts = 100
     for _ in range(max_attempts):
         try:
-            # Use the port from the app's config if not specified
-            actual_port = port or app.config.get('PORT', 5000)
-            response = requests.get(f"http://127.0.0.1:{actual_port}/")
-            if response.status_code == 200:
-                ready_event.set()
-                break
-        except requests.RequestException:
-            pass
-
-        time.sleep(0.5)
-
-    return thread
-
-
-def test_port_allocation():
-    """Test port allocation."""
-    print("Testing port allocation...")
-
-    allocator = PortAllocator()
-    port = allocator.find_available_port()
-
-    print(f"Found available port: {port}")
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return server
+        except OSError:
+            time.sleep(0.05)
 
-    # Allocate the port for a test application
-    app_id = "dynaport-test"
-    allocated_port = allocator.allocate_port(app_id, port)
-
-    print(f"Allocated port {allocated_port} for {app_id}")
-
-    # Verify the port is allocated
-    assigned_port = allocator.get_assigned_port(app_id)
-    assert assigned_port == allocated_port, f"Expected port {allocated_port}, got {assigned_port}"
-
-    print("Port allocation test passed!")
-
-    # Release the port
-    allocator.release_port(app_id)
-
-    # Use the allocated port for the next test
-    if allocated_port is None:
-        allocated_port = 8000
-
-    # Store the port for use in other tests
-    test_port_allocation.port = allocated_port
-
-    # Don't return a value (use assert instead)
-    assert allocated_port > 0, "Port should be a positive number"
-
-
-def test_flask_integration():
-    """Test Flask integration."""
-    print("Testing Flask integration...")
+    server.shutdown()
+    raise RuntimeError("Application failed to start")
 
-    # Get the port from the previous test
-    port = getattr(test_port_allocation, 'port', None)
 
-    # Create a Flask application
+@pytest.fixture(scope="module")
+def dynaport_server():
+    """Start the DynaPort-wrapped test application once for the module."""
     app = create_test_app()
 
-    # Create DynaPort integration
+    # Create DynaPort integration and wrap the Flask app with it
     dynaport = DynaPortFlask(
         app_id="dynaport-test",
         name="DynaPort Test App",
-        preferred_port=port
+        port_allocator=_allocator
     )
-
-    # Wrap the Flask app with DynaPort
     dynaport.wrap_app(app)
 
-    # Verify the port was allocated
-    if port is not None:
-        assert dynaport.port == port, f"Expected port {port}, got {dynaport.port}"
-    else:
-        assert dynaport.port > 0, f"Expected a positive port number, got {dynaport.port}"
+    server = run_test_app(app, dynaport.port)
+    try:
+        yield dynaport, f"http://127.0.0.1:{dynaport.port}"
+    finally:
+        # Clean up, stopping the registry's health check thread so it doesn't
+        # open connections while later tests patch socket.socket
+        server.shutdown()
+        dynaport.shutdown()
+        dynaport.service_registry.close()
+
 
-    # Start the application
-    ready_event = threading.Event()
-    _ = run_test_app(app, port, ready_event)  # We don't need the thread object
+def test_port_allocation():
+    """Test port allocation."""
+    port = _allocator.find_available_port()
+    assert port > 0, "Port should be a positive number"
 
-    # Wait for the application to start
-    if not ready_event.wait(timeout=5):
-        print("Error: Application failed to start")
-        sys.exit(1)
+    # Allocate the port for a test application
+    app_id = "dynaport-test-allocation"
+    allocated_port = _allocator.allocate_port(app_id, port)
 
-    # Test the application
     try:
-        # Use the port from the app's config
-        actual_port = dynaport.port
-        response = requests.get(f"http://127.0.0.1:{actual_port}/")
-        assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
-
-        data = response.json()
-        assert data["message"] == "DynaPort test successful!", f"Unexpected message: {data['message']}"
-        assert data["status"] == "ok", f"Unexpected status: {data['status']}"
-
-        print("Flask integration test passed!")
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+        # Verify the port is allocated
+        assigned_port = _allocator.get_assigned_port(app_id)
+        assert assigned_port == allocated_port, f"Expected port {allocated_port}, got {assigned_port}"
     finally:
-        # Clean up
-        dynaport.shutdown()
+        # Release the port
+        _allocator.release_port(app_id)
 
 
-def main():
-    """Run the installation tests."""
-    print("Testing DynaPort installation...")
+def test_flask_integration(dynaport_server):
+    """Test Flask integration."""
+    dynaport, base_url = dynaport_server
 
-    try:
-        # Test port allocation
-        port = test_port_allocation()
+    # Verify the port was allocated
+    assert dynaport.port > 0, f"Expected a positive port number, got {dynaport.port}"
 
-        # Test Flask integration
-        test_flask_integration(port)
+    # Test the application
+    response = _session.get(f"{base_url}/")
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
 
-        print("\nAll tests passed! DynaPort is installed correctly.")
-    except Exception as e:
-        print(f"\nError: {e}")
-        sys.exit(1)
+    data = response.json()
+    assert data["message"] == "DynaPort test successful!", f"Unexpected message: {data['message']}"
+    assert data["status"] == "ok", f"Unexpected status: {data['status']}"
+
+
+def main():
+    """Run the installation tests."""
+    print("Testing DynaPort installation...")
+    sys.exit(pytest.main([__file__, "-q"]))
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ Unit tests for the port allocator module.
 import json
 import socket
 import tempfile
+import threading
 from pathlib import Path
 from unittest import mock
 
@@ -21,22 +22,31 @@ class TestPortAllocator:
         # Create a temporary directory for port assignments
         self.temp_dir = tempfile.TemporaryDirectory()
         self.storage_path = Path(self.temp_dir.name) / "ports.json"
+        self.allocators = []
 
     def teardown_method(self):
         """Clean up test environment after each test."""
+        for allocator in self.allocators:
+            allocator.close()
         self.temp_dir.cleanup()
 
+    def make_allocator(self, **kwargs):
+        """Create a PortAllocator that is closed after the test."""
+        allocator = PortAllocator(**kwargs)
+        self.allocators.append(allocator)
+        return allocator
+
     def test_init_default_values(self):
         """Test initialization with default values."""
         # Use a custom storage path to avoid interference with existing assignments
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         assert allocator.port_range == (8000, 9000)
         assert allocator.reserved_ports == set()
         assert isinstance(allocator.port_assignments, dict)
 
     def test_init_custom_values(self):
         """Test initialization with custom values."""
-        allocator = PortAllocator(
+        allocator = self.make_allocator(
             storage_path=str(self.storage_path),
             port_range=(5000, 6000),
             reserved_ports={5000, 5001}
@@ -53,12 +63,12 @@ class TestPortAllocator:
             json.dump(assignments, f)
 
         # Load the assignments
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         assert allocator.port_assignments == assignments
 
     def test_save_port_assignments(self):
         """Test saving port assignments to storage."""
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         allocator.port_assignments = {"app1": 8001, "app2": 8002}
         allocator._save_port_assignments()
 
@@ -68,67 +78,202 @@ class TestPortAllocator:
 
         assert saved_assignments == {"app1": 8001, "app2": 8002}
 
+    def test_concurrent_saves(self):
+        """Test that allocators saving the same file don't disturb each other."""
+        allocators = [self.make_allocator(storage_path=str(self.storage_path)) for _ in range(4)]
+        errors = []
+
+        def save(allocator):
+            try:
+                for _ in range(50):
+                    allocator._save_port_assignments()
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(allocator,)) for allocator in allocators]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert [p.name for p in self.storage_path.parent.iterdir()] == ["ports.json"]
+
+    def test_save_failure_removes_temp_file(self):
+        """Test that a failed save leaves no temporary file behind."""
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+        allocator.port_assignments = {"app1": 8001}
+
+        with mock.patch('os.replace', side_effect=OSError("rename failed")):
+            with pytest.raises(OSError):
+                allocator._save_port_assignments()
+
+        assert list(self.storage_path.parent.iterdir()) == []
+
     @mock.patch('socket.socket')
     def test_is_port_available_true(self, mock_socket):
         """Test checking if a port is available (port is available)."""
         # Mock socket to indicate port is available
-        mock_socket_instance = mock.MagicMock()
-        mock_socket.return_value.__enter__.return_value = mock_socket_instance
+        mock_socket_instance = mock_socket.return_value
 
-        allocator = PortAllocator()
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         assert allocator.is_port_available(8000) is True
 
         # Verify socket was used correctly
-        # Note: We don't check the exact number of calls because the implementation
-        # might use socket in different ways
         mock_socket.assert_called_with(socket.AF_INET, socket.SOCK_STREAM)
         mock_socket_instance.bind.assert_called_once_with(('127.0.0.1', 8000))
+        mock_socket_instance.close.assert_called_once()
 
     @mock.patch('socket.socket')
     def test_is_port_available_false_socket_error(self, mock_socket):
         """Test checking if a port is available (port is in use)."""
         # Mock socket to indicate port is in use
-        mock_socket_instance = mock.MagicMock()
-        mock_socket_instance.bind.side_effect = socket.error()
-        mock_socket.return_value.__enter__.return_value = mock_socket_instance
+        mock_socket.return_value.bind.side_effect = socket.error()
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+        assert allocator.is_port_available(8000) is False
 
-        allocator = PortAllocator()
+    @mock.patch('socket.socket')
+    def test_availability(self, mock_socket):
+        """Test checking several ports in one call."""
+        def bind(addr):
+            if addr[1] != 8001:
+                raise OSError()
+
+        mock_socket.return_value.bind.side_effect = bind
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+        allocator.reserve_port(8002)
+
+        assert allocator.availability([8000, 8001, 8002, 8000, 70000]) == [
+            False, True, False, False, False
+        ]
+
+        # Repeated ports are probed once and reserved ports not at all
+        assert mock_socket.return_value.bind.call_args_list == [
+            mock.call(('127.0.0.1', 8000)),
+            mock.call(('127.0.0.1', 8001))
+        ]
+
+    def test_try_reserve(self):
+        """Test reserving a port keeps it bound."""
+        # Pick a port the OS considers free
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+        sock = allocator._try_reserve(port)
+
+        try:
+            assert sock is not None
+            assert sock.getsockname()[1] == port
+
+            # The port cannot be taken while the socket is held
+            assert allocator._try_reserve(port) is None
+        finally:
+            sock.close()
+
+    @mock.patch('socket.socket')
+    def test_is_port_available_reuses_probe_socket(self, mock_socket):
+        """Test that failed checks reuse the probe socket."""
+        mock_socket.return_value.bind.side_effect = OSError()
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         assert allocator.is_port_available(8000) is False
+        assert allocator.is_port_available(8001) is False
+
+        mock_socket.assert_called_once_with(socket.AF_INET, socket.SOCK_STREAM)
+        assert mock_socket.return_value.bind.call_args_list == [
+            mock.call(('127.0.0.1', 8000)),
+            mock.call(('127.0.0.1', 8001))
+        ]
+
+        # A successful bind uses the socket up, so the next check opens a new one
+        mock_socket.return_value.bind.side_effect = None
+        assert allocator.is_port_available(8002) is True
+        mock_socket.return_value.close.assert_called_once()
+        assert allocator.is_port_available(8003) is True
+        assert mock_socket.call_count == 2
+
+        # Probes bind without SO_REUSEADDR, which would hide wildcard listeners on BSD
+        mock_socket.return_value.setsockopt.assert_not_called()
+
+    def test_is_port_available_false_wildcard_listener(self):
+        """Test that a port another socket listens on for all addresses is in use."""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(('0.0.0.0', 0))
+            listener.listen()
+            port = listener.getsockname()[1]
+
+            allocator = self.make_allocator(storage_path=str(self.storage_path))
+            assert allocator.is_port_available(port) is False
 
     def test_is_port_available_false_reserved(self):
         """Test checking if a port is available (port is reserved)."""
-        allocator = PortAllocator(reserved_ports={8000})
+        allocator = self.make_allocator(reserved_ports={8000})
         assert allocator.is_port_available(8000) is False
 
-    @mock.patch.object(PortAllocator, 'is_port_available')
-    def test_find_available_port_success(self, mock_is_port_available):
+    @mock.patch('socket.socket')
+    def test_find_available_port_success(self, mock_socket):
         """Test finding an available port (success case)."""
-        # Mock is_port_available to return True for port 8000
-        mock_is_port_available.side_effect = lambda p: p == 8000
+        # Mock bind to succeed only for port 8000
+        def bind(address):
+            if address[1] != 8000:
+                raise OSError()
+
+        mock_socket_instance = mock_socket.return_value
+        mock_socket_instance.bind.side_effect = bind
 
-        allocator = PortAllocator(port_range=(8000, 8010))
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(8000, 8010))
         port = allocator.find_available_port()
 
         assert port == 8000
 
-    @mock.patch.object(PortAllocator, 'is_port_available')
-    def test_find_available_port_none_available(self, mock_is_port_available):
+        # Verify a single socket was used for the whole scan
+        mock_socket.assert_called_once_with(socket.AF_INET, socket.SOCK_STREAM)
+
+    @mock.patch('socket.socket')
+    def test_find_available_port_none_available(self, mock_socket):
         """Test finding an available port (no ports available)."""
-        # Mock is_port_available to always return False
-        mock_is_port_available.return_value = False
+        # Mock bind to always fail
+        mock_socket_instance = mock_socket.return_value
+        mock_socket_instance.bind.side_effect = OSError()
 
-        allocator = PortAllocator(port_range=(8000, 8010))
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(8000, 8010))
 
         with pytest.raises(RuntimeError):
             allocator.find_available_port()
 
-    @mock.patch.object(PortAllocator, 'is_port_available')
-    def test_allocate_port_already_assigned(self, mock_is_port_available):
+        assert mock_socket_instance.bind.call_count == 11
+
+    def test_candidate_ports_seeded_by_app_id(self):
+        """Test that each application scans the range in its own stable order."""
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(8000, 9000))
+
+        # The same application always gets the same order
+        assert list(allocator._candidate_ports("app1")) == list(allocator._candidate_ports("app1"))
+
+        # Different applications start scanning at different ports
+        first_ports = {next(iter(allocator._candidate_ports(f"app{i}"))) for i in range(100)}
+        assert len(first_ports) > 50
+
+    @mock.patch.object(PortAllocator, '_first_bindable')
+    def test_find_available_port_passes_app_order(self, mock_first_bindable):
+        """Test that find_available_port scans in the application's order."""
+        mock_first_bindable.side_effect = lambda ports: next(iter(ports))
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(8000, 9000))
+
+        assert allocator.find_available_port("app1") == next(iter(allocator._candidate_ports("app1")))
+
+    @mock.patch.object(PortAllocator, '_try_reserve')
+    def test_allocate_port_already_assigned(self, mock_try_reserve):
         """Test allocating a port that is already assigned."""
-        # Mock is_port_available to return True
-        mock_is_port_available.return_value = True
+        # Mock _try_reserve to succeed
+        mock_try_reserve.return_value = mock.MagicMock()
 
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         allocator.port_assignments = {"app1": 8001}
 
         port = allocator.allocate_port("app1")
@@ -136,30 +281,123 @@ class TestPortAllocator:
         assert port == 8001
         assert allocator.port_assignments == {"app1": 8001}
 
-    @mock.patch.object(PortAllocator, 'is_port_available')
-    def test_allocate_port_preferred_available(self, mock_is_port_available):
+    @mock.patch('socket.socket')
+    def test_allocate_port_idempotent_no_syscall(self, mock_socket):
+        """Test re-allocating an assigned port doesn't touch the network."""
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+        allocator.port_assignments = {"app1": 8001}
+
+        # Explicitly asking for the assigned port again
+        assert allocator.allocate_port("app1", preferred_port=8001) == 8001
+        mock_socket.assert_not_called()
+
+        # Allocating again while the port is held
+        allocator.port_assignments = {}
+        assert allocator.allocate_port("app2", preferred_port=8002, hold=True) == 8002
+        mock_socket.reset_mock()
+
+        assert allocator.allocate_port("app2") == 8002
+        mock_socket.assert_not_called()
+
+    @mock.patch.object(PortAllocator, '_try_reserve')
+    def test_allocate_port_preferred_available(self, mock_try_reserve):
         """Test allocating a preferred port that is available."""
-        # Mock is_port_available to return True for preferred port
-        mock_is_port_available.side_effect = lambda p: p == 8002
+        # Mock _try_reserve to succeed for the preferred port
+        mock_try_reserve.side_effect = lambda p: mock.MagicMock() if p == 8002 else None
 
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
 
         port = allocator.allocate_port("app1", preferred_port=8002)
 
         assert port == 8002
         assert allocator.port_assignments == {"app1": 8002}
 
+    @mock.patch('socket.socket')
+    def test_allocate_port_holds_socket(self, mock_socket):
+        """Test that the socket bound while checking a port is held, not rebound."""
+        mock_socket_instance = mock_socket.return_value
+
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
+
+        port = allocator.allocate_port("app1", preferred_port=8002, hold=True)
+
+        assert port == 8002
+        assert mock_socket_instance.bind.call_count == 1
+        mock_socket_instance.close.assert_not_called()
+
+        # Releasing the reservation closes the held socket
+        allocator.release_reservation("app1")
+
+        mock_socket_instance.close.assert_called_once()
+        assert allocator.port_assignments == {"app1": 8002}
+
+    def _free_port(self):
+        """Get a port the OS currently considers free."""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def _assert_bindable(self, port):
+        """Assert that a server could bind the port right now."""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind(('0.0.0.0', port))
+
+    def test_allocated_port_is_bindable(self):
+        """Test that the application can bind the port it was allocated."""
+        port = self._free_port()
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(port, port))
+
+        assert allocator.allocate_port("app1") == port
+        self._assert_bindable(port)
+        assert allocator.is_port_available(port) is True
+
+        # Re-allocating the assigned port leaves it bindable as well
+        assert allocator.allocate_port("app1") == port
+        self._assert_bindable(port)
+
+    def test_close(self):
+        """Test that close() releases held ports and probe sockets."""
+        port = self._free_port()
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(port, port))
+
+        assert allocator.allocate_port("app1", hold=True) == port
+        # The failed check leaves this thread's probe socket open
+        assert allocator.is_port_available(port) is False
+        probe = allocator._probe_local.sock
+
+        allocator.close()
+
+        assert probe.fileno() == -1
+        self._assert_bindable(port)
+        assert allocator.get_assigned_port("app1") == port
+
+        # The allocator keeps working with fresh sockets
+        assert allocator.is_port_available(port) is True
+
+    def test_held_port_is_bindable_after_release(self):
+        """Test that a held port can only be bound once the reservation is released."""
+        port = self._free_port()
+        allocator = self.make_allocator(storage_path=str(self.storage_path), port_range=(port, port))
+
+        assert allocator.allocate_port("app1", hold=True) == port
+        with pytest.raises(OSError):
+            self._assert_bindable(port)
+
+        allocator.release_reservation("app1")
+        self._assert_bindable(port)
+
     @mock.patch.object(PortAllocator, 'find_available_port')
-    @mock.patch.object(PortAllocator, 'is_port_available')
-    def test_allocate_port_find_available(self, mock_is_port_available, mock_find_available_port):
+    @mock.patch.object(PortAllocator, '_try_reserve')
+    def test_allocate_port_find_available(self, mock_try_reserve, mock_find_available_port):
         """Test allocating a port by finding an available one."""
-        # Mock is_port_available to return False for preferred port
-        mock_is_port_available.return_value = False
+        # Mock _try_reserve to fail for the preferred port
+        mock_try_reserve.side_effect = lambda p: mock.MagicMock() if p == 8003 else None
 
         # Mock find_available_port to return 8003
         mock_find_available_port.return_value = 8003
 
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
 
         port = allocator.allocate_port("app1", preferred_port=8002)
 
@@ -168,7 +406,7 @@ class TestPortAllocator:
 
     def test_release_port(self):
         """Test releasing a port allocation."""
-        allocator = PortAllocator(storage_path=str(self.storage_path))
+        allocator = self.make_allocator(storage_path=str(self.storage_path))
         allocator.port_assignments = {"app1": 8001, "app2": 8002}
 
         allocator.release_port("app1")
@@ -183,7 +421,7 @@ class TestPortAllocator:
 
     def test_get_assigned_port(self):
         """Test getting an assigned port."""
-        allocator = PortAllocator()
+        allocator = self.make_allocator()
         allocator.port_assignments = {"app1": 8001, "app2": 8002}
 
         assert allocator.get_assigned_port("app1") == 8001
@@ -192,20 +430,21 @@ class TestPortAllocator:
 
     def test_get_all_assignments(self):
         """Test getting all port assignments."""
-        allocator = PortAllocator()
+        allocator = self.make_allocator()
         allocator.port_assignments = {"app1": 8001, "app2": 8002}
 
         assignments = allocator.get_all_assignments()
 
         assert assignments == {"app1": 8001, "app2": 8002}
 
-        # Check that the returned value is a copy
-        assignments["app3"] = 8003
+        # Check that the returned value is read-only
+        with pytest.raises(TypeError):
+            assignments["app3"] = 8003
         assert "app3" not in allocator.port_assignments
 
     def test_reserve_unreserve_port(self):
         """Test reserving and unreserving ports."""
-        allocator = PortAllocator()
+        allocator = self.make_allocator()
 
         # Initially no reserved ports
         assert allocator.reserved_ports == set()
@@ -225,3 +464,18 @@ class TestPortAllocator:
         # Unreserve a port that isn't reserved
         allocator.unreserve_port(9000)
         assert allocator.reserved_ports == {8001}
+
+    def test_reserved_ports_assignment(self):
+        """Test replacing the reserved ports and rejecting invalid ones."""
+        allocator = self.make_allocator(storage_path=str(self.storage_path), reserved_ports={8000})
+
+        allocator.reserved_ports = {8001, 8002}
+        assert allocator.reserved_ports == {8001, 8002}
+        assert allocator.is_port_available(8001) is False
+
+        # The property is a copy; changing it in place must fail loudly
+        with pytest.raises(AttributeError):
+            allocator.reserved_ports.add(8003)
+
+        with pytest.raises(ValueError):
+            allocator.reserve_port(70000)
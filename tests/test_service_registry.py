@@ -2,16 +2,24 @@
 Unit tests for the service registry module.
 """
 
+import sys
 import json
 import time
 import tempfile
+import threading
+import subprocess
+from collections.abc import Mapping
 from pathlib import Path
 from unittest import mock
 
 import pytest
 import requests
 
-from dynaport.service_registry import ServiceRegistry, ServiceInfo
+from dynaport.service_registry import ServiceRegistry, ServiceInfo, HealthStatus
+from dynaport._atomic import atomic_write
+
+# setup_method patches threading.Thread; keep the real one for concurrency tests
+_Thread = threading.Thread
 
 
 class TestServiceInfo:
@@ -34,7 +42,7 @@ class TestServiceInfo:
         assert service.status == "unknown"
         assert service.health_endpoint is None
         assert service.last_health_check is None
-        assert service.health_status == "unknown"
+        assert service.health_status == HealthStatus.UNKNOWN
         assert service.dependencies == []
         assert service.metadata == {}
 
@@ -62,7 +70,7 @@ class TestServiceInfo:
         assert service.status == "running"
         assert service.health_endpoint == "/health"
         assert service.last_health_check == 123456789.0
-        assert service.health_status == "healthy"
+        assert service.health_status == HealthStatus.HEALTHY
         assert service.dependencies == ["dep1", "dep2"]
         assert service.metadata == {"key": "value"}
 
@@ -87,6 +95,82 @@ class TestServiceInfo:
         assert service_dict["health_endpoint"] == "/health"
         assert service_dict["dependencies"] == ["dep1"]
         assert service_dict["metadata"] == {"key": "value"}
+        assert service_dict["health_status"] == "unknown"
+
+    def test_to_builtins(self):
+        """Test conversion to a dictionary that shares mutable fields."""
+        service = ServiceInfo(
+            app_id="test-app",
+            instance_id="instance1",
+            name="Test App",
+            port=8000,
+            health_status="healthy",
+            dependencies=["dep1"],
+            metadata={"key": "value"}
+        )
+
+        service_dict = service.to_builtins()
+
+        assert service_dict == service.to_dict()
+        assert service_dict["health_status"] == "healthy"
+        assert service_dict["dependencies"] is service.dependencies
+        assert service_dict["metadata"] is service.metadata
+
+    def test_health_status_enum(self):
+        """Test that health status strings are coerced to HealthStatus."""
+        service = ServiceInfo(
+            app_id="test-app",
+            instance_id="instance1",
+            name="Test App",
+            port=8000,
+            health_status="healthy"
+        )
+
+        assert service.health_status is HealthStatus.HEALTHY
+        assert str(service.health_status) == "healthy"
+
+        service.health_status = HealthStatus.UNHEALTHY
+        assert service.to_dict()["health_status"] == "unhealthy"
+        assert ServiceInfo.from_dict(service.to_dict()).health_status is HealthStatus.UNHEALTHY
+
+        with pytest.raises(ValueError):
+            ServiceInfo(
+                app_id="test-app",
+                instance_id="instance1",
+                name="Test App",
+                port=8000,
+                health_status="sick"
+            )
+
+    def test_to_dict_json_shape(self):
+        """Test that health status is serialized by name, not by number."""
+        service = ServiceInfo(
+            app_id="test-app",
+            instance_id="instance1",
+            name="Test App",
+            port=8000,
+            health_status=HealthStatus.HEALTHY
+        )
+
+        expected = {
+            "app_id": "test-app",
+            "instance_id": "instance1",
+            "name": "Test App",
+            "port": 8000,
+            "host": "127.0.0.1",
+            "status": "unknown",
+            "health_endpoint": None,
+            "last_health_check": None,
+            "health_status": "healthy",
+            "dependencies": [],
+            "metadata": {}
+        }
+        assert json.loads(json.dumps(service.to_dict())) == expected
+        assert json.loads(json.dumps(service.to_builtins())) == expected
+        assert f"{service.health_status}" == "healthy"
+
+        orjson = pytest.importorskip("orjson")
+        assert orjson.loads(orjson.dumps(service.to_dict())) == expected
 
     def test_from_dict(self):
         """Test creation from dictionary."""
@@ -114,10 +198,23 @@ class TestServiceInfo:
         assert service.status == "running"
         assert service.health_endpoint == "/health"
         assert service.last_health_check == 123456789.0
-        assert service.health_status == "healthy"
+        assert service.health_status == HealthStatus.HEALTHY
         assert service.dependencies == ["dep1", "dep2"]
         assert service.metadata == {"key": "value"}
 
+    def test_from_dict_ignores_unknown_keys(self):
+        """Test creating from a dictionary with extra keys."""
+        service = ServiceInfo.from_dict({
+            "app_id": "test-app",
+            "instance_id": "instance1",
+            "name": "Test App",
+            "port": 8000,
+            "unknown": "value"
+        })
+
+        assert service.app_id == "test-app"
+        assert not hasattr(service, "unknown")
+
     def test_service_id(self):
         """Test service ID property."""
         service = ServiceInfo(
@@ -141,6 +238,24 @@ class TestServiceInfo:
 
         assert service.url == "http://localhost:8000"
 
+    def test_update_address(self):
+        """Test the URL is updated when the address changes."""
+        service = ServiceInfo(
+            app_id="test-app",
+            instance_id="instance1",
+            name="Test App",
+            port=8000
+        )
+
+        service.update_address(port=8001)
+        assert service.url == "http://127.0.0.1:8001"
+
+        service.update_address(host="localhost")
+        assert service.url == "http://localhost:8001"
+        assert service.service_id == "test-app:instance1"
+        assert "service_id" not in service.to_dict()
+        assert "url" not in service.to_dict()
+
 
 class TestServiceRegistry:
     """Test cases for the ServiceRegistry class."""
@@ -171,7 +286,7 @@ class TestServiceRegistry:
         with mock.patch('threading.Thread'):
             with mock.patch.object(ServiceRegistry, '_load_services'):
                 registry = ServiceRegistry(storage_path=str(self.storage_path))
-                assert isinstance(registry.services, dict)
+                assert isinstance(registry.services, Mapping)
                 assert registry.health_check_interval == 60
 
     def test_init_custom_values(self):
@@ -218,6 +333,175 @@ class TestServiceRegistry:
         assert self.registry.services["app1:instance1"].name == "App 1"
         assert self.registry.services["app2:instance1"].name == "App 2"
 
+    def test_load_services_unknown_health_status(self):
+        """Test that an unknown stored health status doesn't break loading."""
+        services_data = [
+            {
+                "app_id": "app1",
+                "instance_id": "instance1",
+                "name": "App 1",
+                "port": 8001,
+                "health_status": "degraded"
+            },
+            {
+                "app_id": "app2",
+                "instance_id": "instance1",
+                "name": "App 2",
+                "port": 8002,
+                "health_status": "healthy"
+            }
+        ]
+
+        with open(self.storage_path, 'w') as f:
+            json.dump(services_data, f)
+
+        self.registry._load_services()
+
+        assert len(self.registry.services) == 2
+        assert self.registry.services["app1:instance1"].health_status is HealthStatus.UNKNOWN
+        assert self.registry.services["app2:instance1"].health_status is HealthStatus.HEALTHY
+
+    def test_load_services_streaming(self):
+        """Test loading a large services file incrementally."""
+        pytest.importorskip("ijson")
+
+        services_data = [
+            {
+                "app_id": "app1",
+                "instance_id": "instance1",
+                "name": "App 1",
+                "port": 8001,
+                "last_health_check": 123456789.5
+            }
+        ]
+
+        with open(self.storage_path, 'w') as f:
+            json.dump(services_data, f)
+
+        with mock.patch('dynaport.service_registry._STREAM_LOAD_THRESHOLD', 0):
+            self.registry._load_services()
+
+        service = self.registry.services["app1:instance1"]
+        assert service.name == "App 1"
+        assert service.last_health_check == 123456789.5
+        assert isinstance(service.last_health_check, float)
+        assert self.registry.get_services_by_app("app1") == [service]
+
+    def test_load_services_sidecar(self):
+        """Test loading services from the msgpack sidecar."""
+        pytest.importorskip("msgpack")
+
+        service = ServiceInfo(app_id="app1", instance_id="instance1", name="App 1", port=8001)
+        self.registry.services = {service.service_id: service}
+        self.registry._save_services()
+
+        assert self.storage_path.with_suffix(".mpk").exists()
+
+        # The sidecar is used while it matches the JSON file
+        self.registry.services = {}
+        with mock.patch('json.load', side_effect=AssertionError("JSON file read")):
+            self.registry._load_services()
+
+        assert self.registry.services["app1:instance1"].name == "App 1"
+
+        # A changed JSON file takes precedence over the stale sidecar
+        with open(self.storage_path, 'w') as f:
+            json.dump([dict(service.to_dict(), name="Edited App", port=9001)], f)
+
+        self.registry.services = {}
+        self.registry._load_services()
+
+        assert self.registry.services["app1:instance1"].name == "Edited App"
+
+    def test_sidecar_ignored_after_concurrent_replace(self):
+        """Test that a services file replaced right after a save doesn't validate its sidecar."""
+        pytest.importorskip("msgpack")
+
+        service = ServiceInfo(app_id="app1", instance_id="instance1", name="App 1", port=8001)
+        other = dict(service.to_dict(), name="Other Process")
+        real_atomic_write = atomic_write
+
+        def write_then_replace(path, data):
+            stat = real_atomic_write(path, data)
+            # Another process replaces the file before the sidecar is written
+            if path == self.storage_path:
+                real_atomic_write(path, json.dumps([other]).encode())
+            return stat
+
+        self.registry.services = {service.service_id: service}
+        with mock.patch('dynaport.service_registry.atomic_write', side_effect=write_then_replace):
+            self.registry._save_services()
+
+        self.registry.services = {}
+        self.registry._load_services()
+
+        assert self.registry.services["app1:instance1"].name == "Other Process"
+
+    def test_flusher_writes_changes(self):
+        """Test that the flusher thread writes a change after the flush interval."""
+        flusher = _Thread(target=self.registry._flusher_worker, daemon=True)
+        self.registry._flusher_thread = flusher
+        flusher.start()
+
+        self.registry.register_service(ServiceInfo(
+            app_id="app1",
+            instance_id="instance1",
+            name="App 1",
+            port=8001
+        ))
+
+        # Wait for the write without flushing explicitly
+        saved_services = []
+        deadline = time.monotonic() + 5
+        while not saved_services and time.monotonic() < deadline:
+            time.sleep(self.registry.flush_interval)
+            if self.storage_path.exists():
+                saved_services = json.loads(self.storage_path.read_bytes())
+
+        assert [s["app_id"] for s in saved_services] == ["app1"]
+
+    def test_flush_now_waits_for_write_in_progress(self):
+        """Test that flushing waits for a write the flusher thread already claimed."""
+        # The flusher has cleared the dirty flag and is still writing
+        self.registry._dirty.clear()
+        self.registry._save_lock.acquire()
+        try:
+            flush = _Thread(target=self.registry._flush_now)
+            flush.start()
+            flush.join(timeout=0.1)
+            assert flush.is_alive()
+        finally:
+            self.registry._save_lock.release()
+        flush.join(timeout=5)
+        assert not flush.is_alive()
+
+    def test_concurrent_save_writes_latest_snapshot(self):
+        """Test that a save waiting for the lock writes the newest services."""
+        service = ServiceInfo(
+            app_id="app1",
+            instance_id="instance1",
+            name="App 1",
+            port=8001
+        )
+
+        # Start a save while another one holds the lock
+        self.registry._save_lock.acquire()
+        try:
+            saver = _Thread(target=self.registry._save_services)
+            saver.start()
+            time.sleep(0.05)
+
+            # A change made before the waiting save gets the lock
+            self.registry.register_service(service)
+        finally:
+            self.registry._save_lock.release()
+        saver.join()
+
+        with open(self.storage_path, 'r') as f:
+            saved_services = json.load(f)
+
+        assert [s["app_id"] for s in saved_services] == ["app1"]
+
     def test_save_services(self):
         """Test saving services to storage."""
         # Add some services
@@ -264,10 +548,35 @@ class TestServiceRegistry:
 
         assert "test-app:instance1" in self.registry.services
         assert self.registry.services["test-app:instance1"] is service
+        assert self.registry.get_services_by_app("test-app") == [service]
+
+        # Changes have to go through the registry so its indexes stay in sync
+        with pytest.raises(TypeError):
+            self.registry.services["test-app:instance2"] = service
 
         # Check that the service was saved
+        self.registry._flush_now()
         assert self.storage_path.exists()
 
+    def test_register_service_coalesces_writes(self):
+        """Test that several changes are written to storage once."""
+        with mock.patch.object(self.registry, '_save_services') as mock_save:
+            for i in range(3):
+                self.registry.register_service(ServiceInfo(
+                    app_id="test-app",
+                    instance_id=f"instance{i}",
+                    name="Test App",
+                    port=8000 + i
+                ))
+
+            # Nothing is written until the flusher runs
+            mock_save.assert_not_called()
+
+            self.registry._flush_now()
+            self.registry._flush_now()
+
+            mock_save.assert_called_once()
+
     def test_unregister_service(self):
         """Test unregistering a service."""
         # Register a service
@@ -286,6 +595,7 @@ class TestServiceRegistry:
         assert "test-app:instance1" not in self.registry.services
 
         # Check that the services were saved
+        self.registry._flush_now()
         assert self.storage_path.exists()
 
     def test_get_service(self):
@@ -398,6 +708,43 @@ class TestServiceRegistry:
 
         assert len(result) == 0
 
+    def test_get_services_by_app_after_changes(self):
+        """Test the per-application lookup follows registrations."""
+        service1 = ServiceInfo(app_id="app1", instance_id="instance1", name="App 1", port=8001)
+        service2 = ServiceInfo(app_id="app1", instance_id="instance2", name="App 1", port=8002)
+
+        self.registry.register_service(service1)
+        self.registry.register_service(service2)
+
+        assert self.registry.get_services_by_app("app1") == [service1, service2]
+
+        self.registry.unregister_service("app1", "instance1")
+
+        assert self.registry.get_services_by_app("app1") == [service2]
+
+        self.registry.unregister_service("app1", "instance2")
+
+        assert self.registry.get_services_by_app("app1") == []
+        assert "app1" not in self.registry._by_app
+
+    def test_get_all_services_snapshot(self):
+        """Test that readers keep a consistent view while services change."""
+        service1 = ServiceInfo(app_id="app1", instance_id="instance1", name="App 1", port=8001)
+        service2 = ServiceInfo(app_id="app2", instance_id="instance1", name="App 2", port=8002)
+
+        self.registry.register_service(service1)
+        services_before = self.registry.services
+
+        self.registry.register_service(service2)
+
+        # Mutations publish a new mapping instead of changing the old one
+        assert services_before == {service1.service_id: service1}
+        assert self.registry.get_all_services() == [service1, service2]
+
+        self.registry.unregister_service("app1", "instance1")
+
+        assert self.registry.get_all_services() == [service2]
+
     def test_update_service_status(self):
         """Test updating service status."""
         # Register a service
@@ -417,9 +764,10 @@ class TestServiceRegistry:
         assert self.registry.services["test-app:instance1"].status == "running"
 
         # Check that the services were saved
+        self.registry._flush_now()
         assert self.storage_path.exists()
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_check_service_health_healthy(self, mock_get):
         """Test checking service health (healthy case)."""
         # Mock the response
@@ -439,13 +787,13 @@ class TestServiceRegistry:
         # Check the health
         self.registry._check_service_health(service)
 
-        assert service.health_status == "healthy"
+        assert service.health_status == HealthStatus.HEALTHY
         assert service.last_health_check is not None
 
         # Verify the request was made correctly
         mock_get.assert_called_once_with("http://127.0.0.1:8000/health", timeout=5)
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_check_service_health_unhealthy(self, mock_get):
         """Test checking service health (unhealthy case)."""
         # Mock the response
@@ -465,10 +813,10 @@ class TestServiceRegistry:
         # Check the health
         self.registry._check_service_health(service)
 
-        assert service.health_status == "unhealthy"
+        assert service.health_status == HealthStatus.UNHEALTHY
         assert service.last_health_check is not None
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_check_service_health_exception(self, mock_get):
         """Test checking service health (exception case)."""
         # Mock the response to raise an exception
@@ -486,7 +834,7 @@ class TestServiceRegistry:
         # Check the health
         self.registry._check_service_health(service)
 
-        assert service.health_status == "unhealthy"
+        assert service.health_status == HealthStatus.UNHEALTHY
         assert service.last_health_check is not None
 
     def test_get_dependency_order_no_dependencies(self):
@@ -570,6 +918,106 @@ class TestServiceRegistry:
         assert "app4:instance1" in result[1]
         assert "app3:instance1" in result[2]
 
+    def test_check_all_services_health(self):
+        """Test checking the health of all services."""
+        service1 = ServiceInfo(
+            app_id="app1",
+            instance_id="instance1",
+            name="App 1",
+            port=8001,
+            health_endpoint="/health"
+        )
+
+        service2 = ServiceInfo(
+            app_id="app2",
+            instance_id="instance1",
+            name="App 2",
+            port=8002
+        )
+
+        self.registry.services = {
+            service1.service_id: service1,
+            service2.service_id: service2
+        }
+
+        with mock.patch.object(
+            self.registry, '_check_service_health', side_effect=Exception("Test exception")
+        ) as mock_check:
+            self.registry._check_all_services_health()
+
+        # Only services with a health endpoint are checked
+        mock_check.assert_called_once_with(service1)
+        assert service1.health_status == HealthStatus.UNHEALTHY
+        assert service1.last_health_check is not None
+        assert service2.health_status == HealthStatus.UNKNOWN
+
+    def test_check_all_services_health_async(self):
+        """Test checking the health of several services with aiohttp."""
+        pytest.importorskip("aiohttp")
+
+        services = [
+            ServiceInfo(
+                app_id=f"app{i}",
+                instance_id="instance1",
+                name=f"App {i}",
+                port=8000 + i,
+                health_endpoint="/health"
+            )
+            for i in range(3)
+        ]
+        self.registry.services = {service.service_id: service for service in services}
+
+        async def acheck(service):
+            service.health_status = HealthStatus.HEALTHY
+
+        with mock.patch.object(self.registry, '_acheck', side_effect=acheck) as mock_acheck:
+            self.registry._check_all_services_health()
+
+        assert mock_acheck.call_count == 3
+        assert all(service.health_status == HealthStatus.HEALTHY for service in services)
+
+        # Closing the registry releases the event loop
+        self.registry.close()
+        assert self.registry._async_loop is None
+
+    def test_import_does_not_load_aiohttp(self):
+        """Test that aiohttp and asyncio are only imported for async health checks."""
+        code = "import sys, dynaport.cli; print('aiohttp' in sys.modules, 'asyncio' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        assert result.stdout.split() == ["False", "False"]
+
+    def test_empty_registry_does_not_load_aiohttp(self):
+        """Test that health passes over an empty registry don't set up aiohttp."""
+        code = (
+            "import sys, time\n"
+            "from dynaport.service_registry import ServiceRegistry\n"
+            "registry = ServiceRegistry(storage_path=sys.argv[1])\n"
+            "time.sleep(0.2)\n"
+            "registry.close()\n"
+            "print('aiohttp' in sys.modules, registry._async_loop, registry._aiohttp)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code, self.storage_path],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        assert result.stdout.split() == ["False", "None", "None"]
+
+        # The same holds for a direct health pass
+        with mock.patch('dynaport.service_registry._load_aiohttp') as mock_load_aiohttp:
+            self.registry._check_all_services_health()
+            mock_load_aiohttp.assert_not_called()
+        assert self.registry._async_loop is None
+        assert self.registry._aiohttp is None
+
     def test_close(self):
         """Test closing the registry."""
         # Mock the health check thread
@@ -582,3 +1030,6 @@ class TestServiceRegistry:
         # Verify the thread was stopped
         assert self.registry.stop_health_check.is_set()
         self.registry.health_check_thread.join.assert_called_once_with(timeout=1)
+
+        # Verify the services were saved
+        assert self.storage_path.exists()
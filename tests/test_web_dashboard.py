@@ -3,133 +3,153 @@ Unit tests for the web dashboard module.
 """
 
 import json
+import math
+from contextlib import ExitStack
+from operator import attrgetter
+from types import MappingProxyType, SimpleNamespace
 from unittest import mock
 
 import pytest
-from flask import Flask, jsonify, request
+from flask import Flask
 
+import dynaport.web_dashboard as _wd
 from dynaport.web_dashboard import create_dashboard_app
-from dynaport.port_allocator import PortAllocator
-from dynaport.service_registry import ServiceRegistry, ServiceInfo
-from dynaport.config_manager import ConfigManager
+from dynaport.service_registry import ServiceInfo
+from dynaport._json import OrjsonProvider, json_response
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
-class TestWebDashboard:
-    """Test cases for the web dashboard."""
+# orjson parses the response bytes directly, without decoding to str first
+_loads = orjson.loads if orjson is not None else json.loads
 
-    def setup_method(self):
-        """Set up test environment before each test."""
-        # Mock dependencies
-        self.mock_port_allocator = mock.MagicMock(spec=PortAllocator)
-        self.mock_service_registry = mock.MagicMock(spec=ServiceRegistry)
-        self.mock_config_manager = mock.MagicMock(spec=ConfigManager)
+# The golden files hold orjson's output; without it jsonify sorts keys and
+# appends a newline, so only the parsed responses can be compared
+_EXACT_GOLDENS = orjson is not None
+
+
+def _called_once(mock_obj, *args):
+    """Assert that ``mock_obj`` was called exactly once with the given positional arguments."""
+    assert mock_obj.call_count == 1
+    assert mock_obj.call_args.args == args
+    assert not mock_obj.call_args.kwargs
+
+
+class _Stub:
+    """Lightweight stand-in exposing only the methods the dashboard calls."""
+
+    def reset_mock(self):
+        """Clear recorded calls on every mocked method."""
+        for value in vars(self).values():
+            if isinstance(value, mock.Mock):
+                value.reset_mock()
+
+
+class _StubPortAllocator(_Stub):
+    """Port allocator stub with two fixed assignments."""
 
-        # Configure mocks
-        self.mock_port_allocator.get_all_assignments.return_value = {
+    def __init__(self):
+        self.get_all_assignments = mock.Mock(return_value={
             "app1:instance1": 8001,
             "app2:instance1": 8002
-        }
+        })
+        self.availability = mock.Mock(side_effect=lambda ports: [p == 8001 for p in ports])
+        self.release_port = mock.Mock()
 
-        self.mock_port_allocator.is_port_available.side_effect = lambda p: p == 8001
 
-        service1 = ServiceInfo(
-            app_id="app1",
-            instance_id="instance1",
-            name="App 1",
-            port=8001,
-            status="running",
-            health_status="healthy"
-        )
+class _StubServiceRegistry(_Stub):
+    """Service registry stub returning a fixed list of services."""
 
-        service2 = ServiceInfo(
-            app_id="app2",
-            instance_id="instance1",
-            name="App 2",
-            port=8002,
-            status="stopped",
-            health_status="unknown"
-        )
+    def __init__(self, services):
+        self.get_all_services = mock.Mock(return_value=services)
+        self.update_service_status = mock.Mock()
+        self.unregister_service = mock.Mock()
 
-        self.mock_service_registry.get_all_services.return_value = [service1, service2]
 
-        self.mock_config_manager.config = {
+class _StubConfigManager(_Stub):
+    """Configuration manager stub holding a static global config."""
+
+    def __init__(self):
+        self.config = {
             "port_allocator": {
                 "port_range": [8000, 9000]
             }
         }
 
-        # Mock template and static directory creation
-        self.mock_mkdir_patcher = mock.patch('pathlib.Path.mkdir')
-        self.mock_mkdir = self.mock_mkdir_patcher.start()
-
-        # Mock template creation
-        self.mock_create_templates_patcher = mock.patch('dynaport.web_dashboard._create_templates')
-        self.mock_create_templates = self.mock_create_templates_patcher.start()
-
-        # Mock static file creation
-        self.mock_create_static_files_patcher = mock.patch('dynaport.web_dashboard._create_static_files')
-        self.mock_create_static_files = self.mock_create_static_files_patcher.start()
-
-        # Mock DynaPortFlask
-        self.mock_dynaport_flask_patcher = mock.patch('dynaport.web_dashboard.DynaPortFlask')
-        self.mock_dynaport_flask_class = self.mock_dynaport_flask_patcher.start()
-        self.mock_dynaport_flask = mock.MagicMock()
-
-        # Create a Flask app with the API routes
-        app = Flask(__name__)
-
-        @app.route('/api/services')
-        def api_services():
-            return jsonify({
-                "services": [service.to_dict() for service in self.mock_service_registry.get_all_services()]
-            })
-
-        @app.route('/api/ports')
-        def api_ports():
-            assignments = self.mock_port_allocator.get_all_assignments()
-            return jsonify({
-                "assignments": {
-                    app_id: {
-                        "port": port,
-                        "available": self.mock_port_allocator.is_port_available(port)
-                    }
-                    for app_id, port in assignments.items()
-                }
-            })
-
-        @app.route('/api/config')
-        def api_config():
-            return jsonify({
-                "config": self.mock_config_manager.config
-            })
-
-        @app.route('/api/service/<app_id>/<instance_id>/status', methods=['POST'])
-        def api_update_service_status(app_id, instance_id):
-            data = request.json
-            if data and 'status' in data:
-                self.mock_service_registry.update_service_status(app_id, instance_id, data['status'])
-                return jsonify({"success": True})
-            return jsonify({"success": False, "error": "No status provided"}), 400
-
-        @app.route('/api/port/release/<app_id>', methods=['POST'])
-        def api_release_port(app_id):
-            self.mock_port_allocator.release_port(app_id)
-            return jsonify({"success": True})
-
-        @app.route('/api/service/unregister/<app_id>/<instance_id>', methods=['POST'])
-        def api_unregister_service(app_id, instance_id):
-            self.mock_service_registry.unregister_service(app_id, instance_id)
-            return jsonify({"success": True})
-
-        self.mock_dynaport_flask.wrap_app.return_value = app
-        self.mock_dynaport_flask_class.return_value = self.mock_dynaport_flask
-
-    def teardown_method(self):
-        """Clean up test environment after each test."""
-        self.mock_mkdir_patcher.stop()
-        self.mock_create_templates_patcher.stop()
-        self.mock_create_static_files_patcher.stop()
-        self.mock_dynaport_flask_patcher.stop()
+
+@pytest.fixture(scope="class")
+def dashboard():
+    """Build the mocked dependencies and the dashboard app once per test class."""
+    service1 = ServiceInfo(
+        app_id="app1",
+        instance_id="instance1",
+        name="App 1",
+        port=8001,
+        status="running",
+        health_status="healthy"
+    )
+
+    service2 = ServiceInfo(
+        app_id="app2",
+        instance_id="instance1",
+        name="App 2",
+        port=8002,
+        status="stopped",
+        health_status="unknown"
+    )
+
+    mocks = SimpleNamespace(
+        port_allocator=_StubPortAllocator(),
+        service_registry=_StubServiceRegistry([service1, service2]),
+        config_manager=_StubConfigManager(),
+        dynaport_flask=mock.MagicMock()
+    )
+
+    with ExitStack() as stack:
+        # Mock DynaPortFlask, handing back the app it wraps
+        mocks.dynaport_flask_class = stack.enter_context(
+            mock.patch.object(_wd, 'DynaPortFlask')
+        )
+        mocks.dynaport_flask_class.return_value = mocks.dynaport_flask
+        mocks.dynaport_flask.wrap_app.side_effect = lambda app: app
+
+        # Build the real dashboard app; no caching, so every request reaches the mocks
+        app = create_dashboard_app(
+            port_allocator=mocks.port_allocator,
+            service_registry=mocks.service_registry,
+            config_manager=mocks.config_manager,
+            cache_ttl=0,
+            skip_assets=True
+        )
+
+        yield app, mocks
+
+
+@pytest.fixture(scope="class")
+def client(dashboard):
+    """Provide one test client for the dashboard app, shared by the test class."""
+    app, _ = dashboard
+    with app.test_client() as test_client:
+        yield test_client
+
+
+class TestWebDashboard:
+    """Test cases for the web dashboard."""
+
+    @pytest.fixture(autouse=True)
+    def _mocks(self, dashboard):
+        """Set up test environment before each test."""
+        _, mocks = dashboard
+        for mock_obj in vars(mocks).values():
+            mock_obj.reset_mock()
+
+        self.mock_port_allocator = mocks.port_allocator
+        self.mock_service_registry = mocks.service_registry
+        self.mock_config_manager = mocks.config_manager
+        self.mock_dynaport_flask = mocks.dynaport_flask
+        self.mock_dynaport_flask_class = mocks.dynaport_flask_class
 
     def test_create_dashboard_app(self):
         """Test creating the dashboard app."""
@@ -138,7 +158,8 @@ class TestWebDashboard:
             port_allocator=self.mock_port_allocator,
             service_registry=self.mock_service_registry,
             config_manager=self.mock_config_manager,
-            preferred_port=7000
+            preferred_port=7000,
+            skip_assets=True
         )
 
         # Verify DynaPortFlask was created correctly
@@ -158,137 +179,170 @@ class TestWebDashboard:
         # Verify result
         assert isinstance(app, Flask)
 
-    def test_api_services(self):
-        """Test the API endpoint for services data."""
-        # Create the dashboard app
-        app = create_dashboard_app(
+    def test_json_responses_use_orjson(self, dashboard, client):
+        """Test that the dashboard API serializes and parses JSON with orjson."""
+        pytest.importorskip("orjson")
+        app, _ = dashboard
+
+        # Request bodies are parsed by the orjson provider
+        assert isinstance(app.json, OrjsonProvider)
+        assert app.json.loads(b'{"status":"x"}') == {"status": "x"}
+        assert math.isnan(app.json.loads('[NaN]')[0])
+
+        # orjson writes compact output
+        response = client.get('/api/config')
+        assert response.mimetype == "application/json"
+        assert response.data == orjson.dumps({"config": self.mock_config_manager.config})
+
+        response = client.post('/api/service/app1/instance1/status', json={"status": "stopped"})
+        assert _loads(response.data) == {"success": True}
+        response = client.post('/api/service/app1/instance1/status', data="not json")
+        assert response.status_code == 400
+        _called_once(self.mock_service_registry.update_service_status, "app1", "instance1", "stopped")
+
+        # Non-string keys are written as strings
+        with app.test_request_context():
+            response = json_response({"ports": {8001: True}})
+            assert _loads(response.data) == {"ports": {"8001": True}}
+
+    def test_cache_hit_skips_registry(self):
+        """Test that read-only endpoints are served from the response cache."""
+        create_dashboard_app(
             port_allocator=self.mock_port_allocator,
             service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
+            config_manager=self.mock_config_manager,
+            cache_ttl=60,
+            skip_assets=True
         )
+        app = self.mock_dynaport_flask.wrap_app.call_args[0][0]
 
-        # Test the API endpoint
         with app.test_client() as client:
-            response = client.get('/api/services')
-            assert response.status_code == 200
-
-            data = json.loads(response.data)
-            assert "services" in data
-            assert len(data["services"]) == 2
-            assert data["services"][0]["app_id"] == "app1"
-            assert data["services"][1]["app_id"] == "app2"
-
-    def test_api_ports(self):
-        """Test the API endpoint for port allocation data."""
-        # Create the dashboard app
-        app = create_dashboard_app(
+            first = client.get('/api/services')
+            second = client.get('/api/services')
+            assert second.data == first.data
+            assert self.mock_service_registry.get_all_services.call_count == 1
+
+            # Mutations invalidate the cached bodies
+            client.post('/api/service/unregister/app1/instance1')
+            client.get('/api/services')
+            assert self.mock_service_registry.get_all_services.call_count == 2
+
+    def test_cache_serves_stale_body_on_error(self):
+        """Test that an expired cache entry is served when the view fails."""
+        create_dashboard_app(
             port_allocator=self.mock_port_allocator,
             service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
+            config_manager=self.mock_config_manager,
+            cache_ttl=0,
+            skip_assets=True
         )
+        app = self.mock_dynaport_flask.wrap_app.call_args[0][0]
 
-        # Test the API endpoint
         with app.test_client() as client:
-            response = client.get('/api/ports')
-            assert response.status_code == 200
-
-            data = json.loads(response.data)
-            assert "assignments" in data
-            assert "app1:instance1" in data["assignments"]
-            assert "app2:instance1" in data["assignments"]
-            assert data["assignments"]["app1:instance1"]["port"] == 8001
-            assert data["assignments"]["app1:instance1"]["available"] is True
-            assert data["assignments"]["app2:instance1"]["port"] == 8002
-            assert data["assignments"]["app2:instance1"]["available"] is False
-
-    def test_api_config(self):
-        """Test the API endpoint for configuration data."""
-        # Create the dashboard app
-        app = create_dashboard_app(
-            port_allocator=self.mock_port_allocator,
-            service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
-        )
-
+            first = client.get('/api/config')
+            with mock.patch.object(
+                _StubConfigManager, 'config', create=True, new_callable=mock.PropertyMock,
+                side_effect=RuntimeError("config unavailable")
+            ) as config:
+                stale = client.get('/api/config')
+                assert config.called
+            assert stale.status_code == 200
+            assert stale.data == first.data
+
+    def test_api_services(self, client, golden):
+        """Test the API endpoint for services data."""
         # Test the API endpoint
-        with app.test_client() as client:
-            response = client.get('/api/config')
-            assert response.status_code == 200
+        response = client.get('/api/services')
+        assert response.status_code == 200
+        golden("api_services.json.bin", response.data, exact=_EXACT_GOLDENS)
 
-            data = json.loads(response.data)
-            assert "config" in data
-            assert "port_allocator" in data["config"]
-            assert "port_range" in data["config"]["port_allocator"]
-            assert data["config"]["port_allocator"]["port_range"] == [8000, 9000]
-
-    def test_api_update_service_status(self):
-        """Test the API endpoint to update service status."""
-        # Create the dashboard app
-        app = create_dashboard_app(
-            port_allocator=self.mock_port_allocator,
-            service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
-        )
+        data = _loads(response.data)
+        assert "services" in data
+        assert len(data["services"]) == 2
+        assert data["services"][0]["app_id"] == "app1"
+        assert data["services"][1]["app_id"] == "app2"
 
+    def test_api_ports(self, client, golden):
+        """Test the API endpoint for port allocation data."""
         # Test the API endpoint
-        with app.test_client() as client:
-            response = client.post(
-                '/api/service/app1/instance1/status',
-                json={"status": "stopped"}
-            )
-            assert response.status_code == 200
-
-            data = json.loads(response.data)
-            assert data["success"] is True
-
-            # Verify service status was updated
-            self.mock_service_registry.update_service_status.assert_called_once_with(
-                "app1",
-                "instance1",
-                "stopped"
-            )
-
-    def test_api_release_port(self):
-        """Test the API endpoint to release a port."""
-        # Create the dashboard app
-        app = create_dashboard_app(
-            port_allocator=self.mock_port_allocator,
-            service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
-        )
+        response = client.get('/api/ports')
+        assert response.status_code == 200
+        golden("api_ports.json.bin", response.data, exact=_EXACT_GOLDENS)
+
+        data = _loads(response.data)
+        assert "assignments" in data
+        assert "app1:instance1" in data["assignments"]
+        assert "app2:instance1" in data["assignments"]
+        assert data["assignments"]["app1:instance1"]["port"] == 8001
+        assert data["assignments"]["app1:instance1"]["available"] is True
+        assert data["assignments"]["app2:instance1"]["port"] == 8002
+        assert data["assignments"]["app2:instance1"]["available"] is False
+
+        # Availability is checked in one batch
+        assert self.mock_port_allocator.availability.call_count == 1
+
+    def test_api_ports_concurrent_release(self, client):
+        """Test that a port released during the request doesn't misalign the response."""
+        live = {"app1:instance1": 8001, "app2:instance1": 8002}
+
+        def availability(ports):
+            flags = [p == 8001 for p in ports]
+            # Another request releases a port while availability is checked
+            del live["app1:instance1"]
+            return flags
+
+        allocator = self.mock_port_allocator
+        with mock.patch.object(allocator, 'get_all_assignments', return_value=MappingProxyType(live)):
+            with mock.patch.object(allocator, 'availability', side_effect=availability):
+                response = client.get('/api/ports')
+
+        assert response.status_code == 200
+        assert _loads(response.data)["assignments"] == {
+            "app1:instance1": {"port": 8001, "available": True},
+            "app2:instance1": {"port": 8002, "available": False}
+        }
 
+    def test_api_config(self, client, golden):
+        """Test the API endpoint for configuration data."""
         # Test the API endpoint
-        with app.test_client() as client:
-            response = client.post('/api/port/release/app1:instance1')
-            assert response.status_code == 200
-
-            data = json.loads(response.data)
-            assert data["success"] is True
-
-            # Verify port was released
-            self.mock_port_allocator.release_port.assert_called_once_with(
-                "app1:instance1"
-            )
-
-    def test_api_unregister_service(self):
-        """Test the API endpoint to unregister a service."""
-        # Create the dashboard app
-        app = create_dashboard_app(
-            port_allocator=self.mock_port_allocator,
-            service_registry=self.mock_service_registry,
-            config_manager=self.mock_config_manager
+        response = client.get('/api/config')
+        assert response.status_code == 200
+        golden("api_config.json.bin", response.data, exact=_EXACT_GOLDENS)
+
+        data = _loads(response.data)
+        assert "config" in data
+        assert "port_allocator" in data["config"]
+        assert "port_range" in data["config"]["port_allocator"]
+        assert data["config"]["port_allocator"]["port_range"] == [8000, 9000]
+
+    @pytest.mark.parametrize("path,body,mock_attr,expected_args", [
+        (
+            '/api/service/app1/instance1/status',
+            {"status": "stopped"},
+            'mock_service_registry.update_service_status',
+            ("app1", "instance1", "stopped")
+        ),
+        (
+            '/api/port/release/app1:instance1',
+            None,
+            'mock_port_allocator.release_port',
+            ("app1:instance1",)
+        ),
+        (
+            '/api/service/unregister/app1/instance1',
+            None,
+            'mock_service_registry.unregister_service',
+            ("app1", "instance1")
         )
-
+    ], ids=["update_service_status", "release_port", "unregister_service"])
+    def test_api_post(self, client, path, body, mock_attr, expected_args):
+        """Test the API endpoints that update services and ports."""
         # Test the API endpoint
-        with app.test_client() as client:
-            response = client.post('/api/service/unregister/app1/instance1')
-            assert response.status_code == 200
+        response = client.post(path, json=body)
+        assert response.status_code == 200
 
-            data = json.loads(response.data)
-            assert data["success"] is True
+        data = _loads(response.data)
+        assert data["success"] is True
 
-            # Verify service was unregistered
-            self.mock_service_registry.unregister_service.assert_called_once_with(
-                "app1",
-                "instance1"
-            )
+        # Verify the change was passed on
+        _called_once(attrgetter(mock_attr)(self), *expected_args)